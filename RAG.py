@@ -1,208 +1,543 @@
-import os
-import re
-#import torch
-#from transformers import AutoTokenizer
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import requests
-
-# Groq API setup
-GROQ_API_KEY = "API_KEY"  # Replace with your actual Groq API key
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-GROQ_MODEL = "llama-3.3-70b-versatile"
-
-# Paths to pretrained model and dataset
-#MODEL_PATH = "Path_To_snapshpts_directory_of_model"  # Optional, for tokenizer
-DATASET_PATH = "Path_To_Dataset"  # Update with your dataset path
-
-# Load tokenizer (optional, for consistency with Qwen)
-#tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH) if os.path.exists(MODEL_PATH) else None
-
-# Load and process UML dataset
-def load_uml_dataset(DATASET_PATH):
-    uml_diagrams = []
-    file_names = []
-    
-    for file_name in os.listdir(DATASET_PATH):
-        if file_name.endswith('.markdown'):
-            file_path = os.path.join(DATASET_PATH, file_name)
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                uml_blocks = re.findall(r'```(?:plantuml|uml)\n(.*?)\n```', content, re.DOTALL)
-                for block in uml_blocks:
-                    uml_diagrams.append(block.strip())
-                    file_names.append(file_name)
-    
-    print(f"Loaded {len(uml_diagrams)} UML diagrams from {len(file_names)} files")  # Debug print
-    if not uml_diagrams:
-        raise ValueError("No UML diagrams found in .md files.")
-    
-    return uml_diagrams, file_names
-
-# Initialize TF-IDF vectorizer for retrieval
-uml_diagrams, file_names = load_uml_dataset(DATASET_PATH)
-vectorizer = TfidfVectorizer()
-tfidf_matrix = vectorizer.fit_transform(uml_diagrams)
-
-def convert_to_plantuml_format(xml_text: str) -> str:
-    """
-    Convert the simplified UML text format into a PlantUML-like format for better retrieval.
-    Input is expected to be a simplified text format derived from an uncompressed Draw.io XML.
-    """
-    lines = xml_text.split("\n")
-    plantuml_lines = ["@startuml"]
-    
-    current_class = None
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-
-        if line.startswith("Class:"):
-            if current_class:
-                plantuml_lines.append("}")
-            current_class = line.replace("Class:", "").strip()
-            plantuml_lines.append(f"class {current_class} {{")
-        elif line == "Attributes:":
-            continue
-        elif line == "Methods:":
-            continue
-        elif line.startswith("-"):
-            attr = line[1:].strip()
-            plantuml_lines.append(f"  -{attr}")
-        elif line.startswith("+"):
-            method = line[1:].strip()
-            plantuml_lines.append(f"  +{method}")
-        elif line.startswith("Relationship:"):
-            parts = line.split()
-            rel_type = parts[1]
-            from_class = parts[3]
-            to_class = parts[5]
-            
-            if rel_type == "inheritance":
-                plantuml_lines.append(f"{from_class} --|> {to_class}")
-            elif rel_type == "aggregation":
-                plantuml_lines.append(f"{from_class} o--> {to_class}")
-            elif rel_type == "composition":
-                plantuml_lines.append(f"{from_class} *--> {to_class}")
-            elif rel_type == "dependency":
-                plantuml_lines.append(f"{from_class} ..> {to_class}")
-            else:
-                plantuml_lines.append(f"{from_class} --> {to_class}")
-    
-    if current_class:
-        plantuml_lines.append("}")
-    plantuml_lines.append("@enduml")
-    return "\n".join(plantuml_lines)
-
-def retrieve_context(xml_text: str, top_k=3) -> str:
-    """
-    Retrieve top-k relevant UML diagrams from the dataset based on similarity to input.
-    """
-    # Convert the simplified UML text to PlantUML format for better retrieval
-    plantuml_text = convert_to_plantuml_format(xml_text)
-    input_vector = vectorizer.transform([plantuml_text])
-    similarities = cosine_similarity(input_vector, tfidf_matrix).flatten()
-    top_k_indices = np.argsort(similarities)[-top_k:][::-1]
-    
-    context = ["# Retrieved UML Diagrams (Context) - Similarity Scores:"]
-    for idx in top_k_indices:
-        similarity_score = similarities[idx]
-        context.append(f"## From {file_names[idx]} (Similarity: {similarity_score:.4f}):")
-        context.append(uml_diagrams[idx])
-        context.append("")
-    
-    return "\n".join(context)
-
-def build_prompt(xml_text: str, context: str) -> str:
-    """
-    Build a prompt for the Groq API with retrieved context.
-    """
-    return f"""
-You are an expert in software architecture and UML modeling with deep knowledge of design principles and best practices. Your task is to thoroughly analyze the provided UML model, focusing primarily on the UML Input below. Use the retrieved context from similar UML diagrams as a secondary reference to enhance your analysis where relevant (e.g., by comparing class structures, relationships, or design patterns). If the context is limited or unrelated, rely on your expertise in UML best practices to provide a comprehensive and detailed analysis.
-
-## Context (Similar UML Diagrams):
-{context}
-
-## UML Input (Simplified Text Format):
-{xml_text}
-
-## Instructions:
-- Interpret attributes and methods in the UML Input as follows: attributes start with '-', and methods start with '+'. For each attribute or method, identify any additional details like data types (e.g., String, Integer), parameters (e.g., user_info: String), or return types (e.g., : boolean), and include them in your analysis.
-- Evaluate the UML model against UML best practices, including proper use of visibility modifiers (public, private, protected), consistency in naming conventions, appropriate use of stereotypes, and alignment with the domain (e.g., a ticket distribution system).
-- Assess the design using software engineering principles such as encapsulation, cohesion, coupling, and SOLID principles (Single Responsibility, Open/Closed, Liskov Substitution, Interface Segregation, Dependency Inversion).
-- Provide detailed explanations for each identified issue and suggestion, including their impact on readability, maintainability, scalability, and functionality of the system.
-
-## Expected Output:
-### 1. Classes & Attributes:
-- List each class along with its attributes and methods as extracted from the UML Input.
-- For each class:
-  - Comment on the completeness of attributes and methods (e.g., are essential attributes missing?).
-  - Evaluate naming conventions (e.g., clarity, consistency, adherence to standards like camelCase or PascalCase).
-  - Check for visibility modifiers (e.g., public, private) and suggest adding them if missing.
-  - Assess whether the class adheres to the Single Responsibility Principle (e.g., does it have too many responsibilities?).
-
-### 2. Relationships & Multiplicities:
-- List all detected relationships, including their type (e.g., association, aggregation, inheritance), source and target classes, multiplicities (if specified), and any labels.
-- For each relationship:
-  - Evaluate its correctness and appropriateness for the domain (e.g., does an aggregation make sense here?).
-  - Check if multiplicities are logical and complete (e.g., should a 1...1 be a 1...*?).
-  - Assess whether the relationship supports low coupling and high cohesion.
-  - Comment on any missing relationships that could improve the model (e.g., a missing dependency or association).
-
-### 3. Potential Issues:
-- Identify and explain issues in the UML model, such as:
-  - **Naming Issues**: Inconsistent or unclear names for classes, attributes, methods, or relationships (e.g., typos, non-descriptive names).
-  - **Design Issues**: Violations of UML best practices or design principles (e.g., lack of encapsulation, high coupling, low cohesion, SOLID violations).
-  - **Completeness Issues**: Missing classes, attributes, methods, or relationships that are essential for the domain.
-  - **Domain Appropriateness**: Elements that do not align with the system’s purpose (e.g., a ticket distribution system should have specific features).
-- For each issue, explain its impact on the system (e.g., how it affects readability, maintainability, or functionality).
-
-### 4. Scope of Improvement:
-- Provide a detailed analysis of how the UML model can be improved, considering the following aspects:
-  - **Structural Improvements**: Suggest adding or modifying classes, attributes, methods, or relationships to better represent the system (e.g., introduce a new class for a missing concept).
-  - **Design Pattern Applicability**: Recommend design patterns that could enhance the model (e.g., Factory pattern for ticket creation, Observer pattern for transaction updates).
-  - **Scalability and Maintainability**: Explain how the model can be made more scalable (e.g., by reducing coupling) and maintainable (e.g., by improving encapsulation).
-  - **Domain Alignment**: Suggest changes to better align the model with the domain (e.g., adding validation logic for tickets in a ticket distribution system).
-  - **Best Practices**: Recommend adherence to UML best practices (e.g., adding visibility modifiers, using stereotypes for clarity).
-- For each suggestion, provide a detailed explanation of how it improves the model, including benefits to readability, maintainability, scalability, and functionality.
-
-### 5. Comparison with Context (Optional):
-- If the retrieved context contains relevant UML diagrams, compare the input UML model with the context:
-  - Highlight similarities or differences in class structures, relationships, or design approaches.
-  - Suggest improvements based on patterns or practices observed in the context (e.g., "The context diagram uses a Factory pattern for ticket creation, which could be applied here").
-- If the context is not relevant, skip this section.
-
-Focus on providing a thorough, detailed, and actionable analysis that helps the user improve their UML model. Ensure all suggestions are practical and directly applicable to the given diagram.
-    """
-
-def query_groq(prompt: str) -> str:
-    """
-    Query the Groq API for UML analysis.
-    """
-    headers = {"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"}
-    payload = {
-        "model": GROQ_MODEL,
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "max_tokens": 2048,
-        "temperature": 1.0,
-        "top_p": 0.98
-    }
-
-    response = requests.post(GROQ_API_URL, json=payload, headers=headers)
-    if response.status_code == 200:
-        return response.json().get("choices", [{}])[0].get("message", {}).get("content", "No response from AI.")
-    else:
-        return f"Error from Groq API: {response.status_code} - {response.text}"
-
-def analyze_uml(xml_text: str) -> str:
-    """
-    Analyze UML model using RAG with Groq API.
-    """
-    context = retrieve_context(xml_text, top_k=3)
-    prompt = build_prompt(xml_text, context)
-    feedback = query_groq(prompt)
-    return feedback
+import asyncio
+import logging
+import os
+import threading
+import time
+#import torch
+#from transformers import AutoTokenizer
+import httpx
+from feedback_cache import FeedbackCache, MemoryCacheBackend, SQLiteCacheBackend
+from llm_client import LLMClient
+from prompt_builder import PromptAssembler
+from telemetry import log_sampled, record_incremental, record_prompt, record_usage, span
+from uml_diff import SessionStore, affected_classes, diagram_structure, merge_sections, split_sections, subset_text
+# numpy/scipy (uml_index) and the retrieval backends are imported when the index is loaded, not with this module
+
+logger = logging.getLogger(__name__)
+
+# Groq API setup
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "API_KEY")  # Replace with your actual Groq API key
+GROQ_API_URL = os.environ.get("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GROQ_TIMEOUT = float(os.environ.get("GROQ_TIMEOUT", "60"))  # Seconds to wait for a completion
+GROQ_MAX_CONCURRENCY = int(os.environ.get("GROQ_MAX_CONCURRENCY", "8"))  # In-flight Groq requests per worker
+GROQ_MAX_RETRIES = int(os.environ.get("GROQ_MAX_RETRIES", "3"))  # Retries on 429/5xx and connection errors
+GROQ_ERROR_PREFIX = "Error from Groq API"
+
+# Feedback cache, keyed on the canonical structure of the simplified UML
+FEEDBACK_CACHE_SIZE = int(os.environ.get("UMLIFY_CACHE_SIZE", "1024"))  # Maximum cached diagrams
+FEEDBACK_CACHE_TTL = float(os.environ.get("UMLIFY_CACHE_TTL", str(24 * 3600)))  # Seconds before an entry expires
+FEEDBACK_CACHE_PATH = os.environ.get("UMLIFY_CACHE_PATH", "")  # SQLite file to persist the cache; empty keeps it in memory
+# Incremental re-analysis sessions are kept apart from the feedback (in their own table of the same SQLite
+# file, if any), so that they neither evict cached feedback nor count as cache entries
+SESSION_STORE_SIZE = int(os.environ.get("UMLIFY_SESSION_SIZE", "1024"))  # Maximum remembered diagrams
+SESSION_STORE_TTL = float(os.environ.get("UMLIFY_SESSION_TTL", str(24 * 3600)))  # Seconds before a session is forgotten
+
+# Paths to pretrained model and dataset
+#MODEL_PATH = "Path_To_snapshpts_directory_of_model"  # Optional, for tokenizer
+DATASET_PATH = os.environ.get("UMLIFY_DATASET_PATH", "Path_To_Dataset")  # Update with your dataset path
+INDEX_PATH = os.environ.get("UMLIFY_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "uml_index"))  # Persistent retrieval index
+# "build" loads (and refreshes) the index itself; "attach" maps an index built by the primary process read-only,
+# which is what worker processes of a multi-worker deployment use
+INDEX_MODE = os.environ.get("UMLIFY_INDEX_MODE", "build")
+# Inputs passed to the backend per search call: the dense backend scores them with one matrix product,
+# the sparse and minhash backends still search them one query at a time
+RETRIEVAL_BATCH_SIZE = 256
+# "sparse" (exact top-k over the inverted index), "dense" (score every diagram) or "minhash" (approximate, structural LSH)
+RETRIEVAL_BACKEND = os.environ.get("UMLIFY_RETRIEVAL_BACKEND", "sparse")
+
+# Prompt assembly: retrieved diagrams are only added while the prompt stays within the token budget
+PROMPT_TOKEN_BUDGET = int(os.environ.get("UMLIFY_PROMPT_TOKEN_BUDGET", "3000"))  # Estimated prompt tokens
+CONTEXT_MIN_SIMILARITY = float(os.environ.get("UMLIFY_CONTEXT_MIN_SIMILARITY", "0.15"))  # Weaker matches are left out
+CONTEXT_MAX_DIAGRAM_TOKENS = int(os.environ.get("UMLIFY_CONTEXT_MAX_DIAGRAM_TOKENS", "600"))  # Larger diagrams are summarized
+CONTEXT_CANDIDATES = 3  # Matches retrieved per context diagram, so duplicates from one file can be skipped
+
+# Load tokenizer (optional, for consistency with Qwen)
+#tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH) if os.path.exists(MODEL_PATH) else None
+
+# Load and process UML dataset
+def load_uml_dataset(DATASET_PATH):
+    from uml_index import read_uml_blocks
+
+    uml_diagrams = []
+    file_names = []
+    
+    for file_name in os.listdir(DATASET_PATH):
+        if file_name.endswith('.markdown'):
+            file_path = os.path.join(DATASET_PATH, file_name)
+            for block in read_uml_blocks(file_path):
+                uml_diagrams.append(block)
+                file_names.append(file_name)
+    
+    logger.info("Loaded %d UML diagrams from %d files", len(uml_diagrams), len(file_names))
+    if not uml_diagrams:
+        raise ValueError("No UML diagrams found in .md files.")
+    
+    return uml_diagrams, file_names
+
+# The persisted TF-IDF index for retrieval (built on first run, refreshed incrementally afterwards) is loaded
+# by load_index, in the background at app startup. Until then, and if loading fails (e.g. a wrong dataset
+# path), prompts are assembled without retrieved context.
+uml_index = None
+uml_diagrams, file_names = [], []
+vectorizer = tfidf_matrix = None
+retrieval_backend = None
+index_state = {"status": "not_loaded", "error": None, "seconds": None}
+_index_lock = threading.Lock()
+
+def load_index() -> bool:
+    """
+    Load (or build) the retrieval index and create the retrieval backend, unless that already happened.
+    Returns whether retrieval is available; errors are logged and reported by index_status().
+    """
+    global uml_index, uml_diagrams, file_names, vectorizer, tfidf_matrix, retrieval_backend
+    with _index_lock:
+        if index_state["status"] in ("ready", "failed"):
+            return index_state["status"] == "ready"
+        index_state["status"] = "loading"
+        start = time.perf_counter()
+        try:
+            from retrieval import create_backend
+            from uml_index import attach_index, load_or_build_index
+
+            if INDEX_MODE == "attach":
+                index = attach_index(INDEX_PATH)
+            else:
+                index = load_or_build_index(DATASET_PATH, INDEX_PATH)
+            backend = create_backend(RETRIEVAL_BACKEND, index)
+        except Exception as e:
+            logger.error("Retrieval index unavailable, analyzing without context: %s: %s", type(e).__name__, e)
+            index_state.update(status="failed", error=f"{type(e).__name__}: {e}")
+            return False
+        finally:
+            index_state["seconds"] = round(time.perf_counter() - start, 3)
+
+        uml_index = vectorizer = index
+        uml_diagrams, file_names = index.diagrams, index.file_names
+        tfidf_matrix = index.matrix
+        retrieval_backend = backend  # Set last: retrieve_matches uses the index once this is set
+        index_state["status"] = "ready"
+        return True
+
+async def warm_up_index():
+    """
+    load_index in a worker thread, so that the server accepts requests while the index loads.
+    """
+    await asyncio.to_thread(load_index)
+
+def index_ready() -> bool:
+    return retrieval_backend is not None
+
+def index_settled() -> bool:
+    """
+    Whether retrieval has its final outcome: the index is loaded, or failed to load (and never will be).
+    """
+    return index_state["status"] in ("ready", "failed")
+
+def index_status() -> dict:
+    return dict(index_state, diagrams=len(uml_diagrams))
+
+def convert_to_plantuml_format(xml_text: str) -> str:
+    """
+    Convert the simplified UML text format into a PlantUML-like format for better retrieval.
+    Input is expected to be a simplified text format derived from an uncompressed Draw.io XML.
+    """
+    lines = xml_text.split("\n")
+    plantuml_lines = ["@startuml"]
+    
+    current_class = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith("Class:"):
+            if current_class:
+                plantuml_lines.append("}")
+            current_class = line.replace("Class:", "").strip()
+            plantuml_lines.append(f"class {current_class} {{")
+        elif line == "Attributes:":
+            continue
+        elif line == "Methods:":
+            continue
+        elif line.startswith("-"):
+            attr = line[1:].strip()
+            plantuml_lines.append(f"  -{attr}")
+        elif line.startswith("+"):
+            method = line[1:].strip()
+            plantuml_lines.append(f"  +{method}")
+        elif line.startswith("Relationship:"):
+            parts = line.split()
+            rel_type = parts[1]
+            from_class = parts[3]
+            to_class = parts[5]
+            
+            if rel_type == "inheritance":
+                plantuml_lines.append(f"{from_class} --|> {to_class}")
+            elif rel_type == "aggregation":
+                plantuml_lines.append(f"{from_class} o--> {to_class}")
+            elif rel_type == "composition":
+                plantuml_lines.append(f"{from_class} *--> {to_class}")
+            elif rel_type == "dependency":
+                plantuml_lines.append(f"{from_class} ..> {to_class}")
+            else:
+                plantuml_lines.append(f"{from_class} --> {to_class}")
+    
+    if current_class:
+        plantuml_lines.append("}")
+    plantuml_lines.append("@enduml")
+    return "\n".join(plantuml_lines)
+
+def retrieve_context(xml_text: str, top_k=3) -> str:
+    """
+    Retrieve top-k relevant UML diagrams from the dataset based on similarity to input.
+    """
+    return retrieve_contexts([xml_text], top_k)[0]
+
+def retrieve_contexts(xml_texts: list, top_k=3) -> list:
+    """
+    Batch variant of retrieve_context.
+    """
+    return [format_context(matches) for matches in retrieve_matches(xml_texts, top_k)]
+
+def retrieve_matches(xml_texts: list, top_k=3) -> list:
+    """
+    Top-k matches per input as lists of (file_name, similarity, diagram), best first. Inputs are converted
+    to PlantUML format (for better retrieval) and searched with the configured backend, RETRIEVAL_BATCH_SIZE
+    inputs at a time. Before the index is loaded every input gets no matches.
+    """
+    backend = retrieval_backend
+    if backend is None:
+        log_sampled(logger, logging.DEBUG, "Retrieval index not loaded (%s), no context retrieved", index_state["status"])
+        return [[] for _ in xml_texts]
+    top_k = min(top_k, len(uml_diagrams))
+    matches = []
+    for start in range(0, len(xml_texts), RETRIEVAL_BATCH_SIZE):
+        with span("convert_to_plantuml_format"):
+            plantuml_texts = [convert_to_plantuml_format(xml_text) for xml_text in xml_texts[start:start + RETRIEVAL_BATCH_SIZE]]
+        with span("retrieve_context"):
+            results = backend.search(plantuml_texts, top_k)
+        for rows, scores in results:
+            matches.append([(file_names[idx], float(score), uml_diagrams[idx]) for idx, score in zip(rows, scores)])
+    return matches
+
+def format_context(matches: list) -> str:
+    context = ["# Retrieved UML Diagrams (Context) - Similarity Scores:"]
+    for file_name, similarity_score, diagram in matches:
+        context.append(f"## From {file_name} (Similarity: {similarity_score:.4f}):")
+        context.append(diagram)
+        context.append("")
+    return "\n".join(context)
+
+def build_prompt(xml_text: str, context: str) -> str:
+    """
+    Build a prompt for the Groq API with retrieved context.
+    Superseded by assemble_prompt; kept as the baseline for prompt size comparisons.
+    """
+    return f"""
+You are an expert in software architecture and UML modeling with deep knowledge of design principles and best practices. Your task is to thoroughly analyze the provided UML model, focusing primarily on the UML Input below. Use the retrieved context from similar UML diagrams as a secondary reference to enhance your analysis where relevant (e.g., by comparing class structures, relationships, or design patterns). If the context is limited or unrelated, rely on your expertise in UML best practices to provide a comprehensive and detailed analysis.
+
+## Context (Similar UML Diagrams):
+{context}
+
+## UML Input (Simplified Text Format):
+{xml_text}
+
+## Instructions:
+- Interpret attributes and methods in the UML Input as follows: attributes start with '-', and methods start with '+'. For each attribute or method, identify any additional details like data types (e.g., String, Integer), parameters (e.g., user_info: String), or return types (e.g., : boolean), and include them in your analysis.
+- Evaluate the UML model against UML best practices, including proper use of visibility modifiers (public, private, protected), consistency in naming conventions, appropriate use of stereotypes, and alignment with the domain (e.g., a ticket distribution system).
+- Assess the design using software engineering principles such as encapsulation, cohesion, coupling, and SOLID principles (Single Responsibility, Open/Closed, Liskov Substitution, Interface Segregation, Dependency Inversion).
+- Provide detailed explanations for each identified issue and suggestion, including their impact on readability, maintainability, scalability, and functionality of the system.
+
+## Expected Output:
+### 1. Classes & Attributes:
+- List each class along with its attributes and methods as extracted from the UML Input.
+- For each class:
+  - Comment on the completeness of attributes and methods (e.g., are essential attributes missing?).
+  - Evaluate naming conventions (e.g., clarity, consistency, adherence to standards like camelCase or PascalCase).
+  - Check for visibility modifiers (e.g., public, private) and suggest adding them if missing.
+  - Assess whether the class adheres to the Single Responsibility Principle (e.g., does it have too many responsibilities?).
+
+### 2. Relationships & Multiplicities:
+- List all detected relationships, including their type (e.g., association, aggregation, inheritance), source and target classes, multiplicities (if specified), and any labels.
+- For each relationship:
+  - Evaluate its correctness and appropriateness for the domain (e.g., does an aggregation make sense here?).
+  - Check if multiplicities are logical and complete (e.g., should a 1...1 be a 1...*?).
+  - Assess whether the relationship supports low coupling and high cohesion.
+  - Comment on any missing relationships that could improve the model (e.g., a missing dependency or association).
+
+### 3. Potential Issues:
+- Identify and explain issues in the UML model, such as:
+  - **Naming Issues**: Inconsistent or unclear names for classes, attributes, methods, or relationships (e.g., typos, non-descriptive names).
+  - **Design Issues**: Violations of UML best practices or design principles (e.g., lack of encapsulation, high coupling, low cohesion, SOLID violations).
+  - **Completeness Issues**: Missing classes, attributes, methods, or relationships that are essential for the domain.
+  - **Domain Appropriateness**: Elements that do not align with the system’s purpose (e.g., a ticket distribution system should have specific features).
+- For each issue, explain its impact on the system (e.g., how it affects readability, maintainability, or functionality).
+
+### 4. Scope of Improvement:
+- Provide a detailed analysis of how the UML model can be improved, considering the following aspects:
+  - **Structural Improvements**: Suggest adding or modifying classes, attributes, methods, or relationships to better represent the system (e.g., introduce a new class for a missing concept).
+  - **Design Pattern Applicability**: Recommend design patterns that could enhance the model (e.g., Factory pattern for ticket creation, Observer pattern for transaction updates).
+  - **Scalability and Maintainability**: Explain how the model can be made more scalable (e.g., by reducing coupling) and maintainable (e.g., by improving encapsulation).
+  - **Domain Alignment**: Suggest changes to better align the model with the domain (e.g., adding validation logic for tickets in a ticket distribution system).
+  - **Best Practices**: Recommend adherence to UML best practices (e.g., adding visibility modifiers, using stereotypes for clarity).
+- For each suggestion, provide a detailed explanation of how it improves the model, including benefits to readability, maintainability, scalability, and functionality.
+
+### 5. Comparison with Context (Optional):
+- If the retrieved context contains relevant UML diagrams, compare the input UML model with the context:
+  - Highlight similarities or differences in class structures, relationships, or design approaches.
+  - Suggest improvements based on patterns or practices observed in the context (e.g., "The context diagram uses a Factory pattern for ticket creation, which could be applied here").
+- If the context is not relevant, skip this section.
+
+Focus on providing a thorough, detailed, and actionable analysis that helps the user improve their UML model. Ensure all suggestions are practical and directly applicable to the given diagram.
+    """
+
+prompt_assembler = PromptAssembler(PROMPT_TOKEN_BUDGET, CONTEXT_MIN_SIMILARITY, CONTEXT_MAX_DIAGRAM_TOKENS)
+
+def assemble_prompt(xml_text: str, matches: list, lint: list = None, classes: list = None, other_classes: list = ()):
+    """
+    Build the chat messages for an analysis within the prompt token budget.
+    """
+    with span("build_prompt"):
+        prompt = prompt_assembler.assemble(xml_text, matches, lint, classes, other_classes)
+    record_prompt(prompt.token_count)
+    log_sampled(logger, logging.DEBUG, "Prompt: ~%d tokens, %d context diagrams, dropped %s",
+                prompt.token_count, len(prompt.context_files), prompt.dropped)
+    return prompt
+
+def retrieve_prompt_matches(xml_texts: list) -> list:
+    """
+    Candidate context for assemble_prompt: more matches than context diagrams, so that duplicates can be skipped.
+    """
+    return retrieve_matches(xml_texts, prompt_assembler.max_context_diagrams * CONTEXT_CANDIDATES)
+
+# Shared by every request of this worker: pooled keep-alive connections, bounded concurrency, retries.
+# Waiting for a free slot is timed as the llm_queue stage, the API call itself as query_groq.
+groq_client = LLMClient(GROQ_API_URL, GROQ_API_KEY, timeout=GROQ_TIMEOUT,
+                        max_concurrency=GROQ_MAX_CONCURRENCY, max_retries=GROQ_MAX_RETRIES,
+                        span=span, queue_stage="llm_queue", request_stage="query_groq")
+
+def groq_payload(messages: list) -> dict:
+    return {
+        "model": GROQ_MODEL,
+        "messages": messages,
+        "max_tokens": 2048,
+        "temperature": 1.0,
+        "top_p": 0.98
+    }
+
+if FEEDBACK_CACHE_PATH:
+    feedback_cache_backend = SQLiteCacheBackend(FEEDBACK_CACHE_PATH, FEEDBACK_CACHE_SIZE, FEEDBACK_CACHE_TTL)
+    session_store_backend = SQLiteCacheBackend(FEEDBACK_CACHE_PATH, SESSION_STORE_SIZE, SESSION_STORE_TTL, table="sessions")
+else:
+    feedback_cache_backend = MemoryCacheBackend(FEEDBACK_CACHE_SIZE, FEEDBACK_CACHE_TTL)
+    session_store_backend = MemoryCacheBackend(SESSION_STORE_SIZE, SESSION_STORE_TTL)
+feedback_cache = FeedbackCache(feedback_cache_backend, namespace=GROQ_MODEL)
+# Previous upload of each diagram of a session, for incremental re-analysis
+session_store = SessionStore(session_store_backend, namespace=f"session\0{GROQ_MODEL}")
+
+async def query_groq(messages: list) -> str:
+    """
+    Query the Groq API for UML analysis.
+    """
+    try:
+        response = await groq_client.post(groq_payload(messages))
+    except httpx.HTTPError as e:
+        logger.error("Groq API request failed: %s - %s", type(e).__name__, e)
+        return f"{GROQ_ERROR_PREFIX}: {type(e).__name__} - {e}"
+    if response.status_code == 200:
+        result = response.json()
+        record_usage(result.get("usage") or {})
+        return result.get("choices", [{}])[0].get("message", {}).get("content", "No response from AI.")
+    else:
+        logger.error("Groq API returned %s", response.status_code)
+        return f"{GROQ_ERROR_PREFIX}: {response.status_code} - {response.text}"
+
+async def analyze_uml(xml_text: str, matches: list = None, lint: list = None, classes: list = None,
+                      other_classes: list = ()) -> str:
+    """
+    Analyze UML model using RAG with Groq API.
+    The retrieved matches can be passed in when they were already computed (e.g. for a whole batch at once).
+    lint is the list of uml_lint findings the user already got, which the prompt tells the model not to repeat.
+    With `classes`, the feedback is written as one "## Class: <Name>" section per listed class (see uml_diff).
+    """
+    if matches is None:
+        # Retrieval is CPU-bound, so keep it off the event loop
+        matches = (await asyncio.to_thread(retrieve_prompt_matches, [xml_text]))[0]
+    prompt = assemble_prompt(xml_text, matches, lint, classes, other_classes)
+    feedback = await query_groq(prompt.messages)
+    return feedback
+
+def is_cacheable_feedback(feedback: str) -> bool:
+    return not feedback.startswith(GROQ_ERROR_PREFIX)
+
+def should_cache_feedback(feedback: str, settled: bool) -> bool:
+    """
+    Feedback generated without context while the index is still loading is not cached, so that the
+    diagram gets a full analysis once retrieval is available. `settled` is index_settled() taken before
+    the context was retrieved (the index usually finishes loading while the LLM call is running).
+    """
+    return is_cacheable_feedback(feedback) and settled
+
+def lint_variant(lint: list) -> str:
+    """
+    Feedback cache variant for a set of lint findings: they change the prompt, and some (e.g. missing
+    visibility modifiers) depend on details the simplified text does not keep.
+    """
+    return "\n".join(sorted(finding["message"] for finding in lint or ()))
+
+async def analyze_uml_cached(xml_text: str, lint: list = None) -> str:
+    """
+    analyze_uml behind the feedback cache: resubmitting the same diagram (in any element order or layout)
+    returns the stored feedback without retrieval or an LLM call.
+    """
+    settled = index_settled()
+    return await feedback_cache.get_or_compute(xml_text, lambda text: analyze_uml(text, lint=lint),
+                                               lambda feedback: should_cache_feedback(feedback, settled),
+                                               variant=lint_variant(lint))
+
+async def stream_groq(messages: list):
+    """
+    Stream the Groq completion for a prompt, yielding text deltas as they are generated.
+    Raises httpx.HTTPError if the API fails before or during the stream.
+    """
+    usage = {}
+    async for token in groq_client.stream(groq_payload(messages), usage):
+        yield token
+    record_usage(usage)
+
+async def analyze_uml_stream(xml_text: str, lint: list = None):
+    """
+    Streaming variant of analyze_uml_cached: yields the feedback token by token.
+    Cached feedback is yielded at once; freshly generated feedback is cached when the stream completes.
+    """
+    variant = lint_variant(lint)
+    cached = feedback_cache.get(xml_text, variant)
+    if cached is not None:
+        yield cached
+        return
+
+    settled = index_settled()
+    matches = (await asyncio.to_thread(retrieve_prompt_matches, [xml_text]))[0]
+    prompt = assemble_prompt(xml_text, matches, lint)
+    tokens = []
+    async for token in stream_groq(prompt.messages):
+        tokens.append(token)
+        yield token
+    feedback = "".join(tokens)
+    if should_cache_feedback(feedback, settled):
+        feedback_cache.set(xml_text, feedback, variant)
+
+def plan_incremental(session_key: str, xml_text: str, pages: list, lint: list = None) -> dict:
+    """
+    Diff an uploaded diagram against the previous upload of the same session. Returns the classes to
+    re-analyze (changed ones and their neighbours, plus any without stored feedback), the reusable
+    per-class feedback, and the prompt input for the re-analyzed classes.
+    """
+    with span("diff_models"):
+        structure = diagram_structure(pages)
+        state = session_store.get(session_key) or {}
+        diff, affected = affected_classes(state.get("structure"), structure)
+        affected = set(affected)
+        sections = {name: section for name, section in state.get("sections", {}).items()
+                    if name in structure["classes"] and name not in affected}
+        classes = [name for name in structure["order"] if name not in sections]
+        full = len(classes) == len(structure["order"])
+        plan = {
+            "session_key": session_key,
+            "structure": structure,
+            "diff": diff.to_dict() if diff is not None else None,
+            "classes": classes,
+            "other_classes": [name for name in structure["order"] if name in sections],
+            "sections": sections,
+            "overall": state.get("overall", "") if diff is not None else "",
+            "full": full,
+            # A full analysis sends the whole diagram, so it can share the content-addressed feedback cache
+            "text": xml_text if full else subset_text(pages, classes),
+            "lint": lint if full else [finding for finding in lint or () if finding["element"] in set(classes)],
+            "variant": "sections\n" + lint_variant(lint),
+        }
+    return plan
+
+def finish_incremental(plan: dict, feedback: str) -> str:
+    """
+    Merge the new class sections with the reused ones, remember the result for the session's next upload
+    and return the feedback for the whole diagram.
+    """
+    structure = plan["structure"]
+    new_sections, overall = split_sections(feedback)
+    sections = dict(plan["sections"])
+    sections.update((name, section) for name, section in new_sections.items() if name in structure["classes"])
+    overall = overall or plan["overall"]
+    session_store.set(plan["session_key"], structure, sections, overall)
+    record_incremental(len(plan["classes"]), len(plan["sections"]))
+    return merge_sections(structure["order"], sections, overall)
+
+def incremental_stats(plan: dict) -> dict:
+    return {"reanalyzed": plan["classes"], "reused": len(plan["sections"]), "diff": plan["diff"]}
+
+async def analyze_uml_incremental(session_key: str, xml_text: str, pages: list, lint: list = None,
+                                  stats: dict = None) -> str:
+    """
+    Re-analyze an edited diagram: only the classes that changed since the session's previous upload of it,
+    and their neighbours, are sent to the model; the stored feedback of the other classes is reused.
+    `stats` (if given) receives the re-analyzed classes, the number of reused ones and the diff.
+    """
+    plan = plan_incremental(session_key, xml_text, pages, lint)
+    if not plan["structure"]["order"]:  # No classes to write sections for
+        return await analyze_uml_cached(xml_text, lint)
+    if stats is not None:
+        stats.update(incremental_stats(plan))
+    if not plan["classes"]:
+        return finish_incremental(plan, "")
+
+    async def compute(text: str) -> str:
+        return await analyze_uml(text, lint=plan["lint"], classes=plan["classes"], other_classes=plan["other_classes"])
+
+    if plan["full"]:
+        settled = index_settled()
+        feedback = await feedback_cache.get_or_compute(plan["text"], compute,
+                                                       lambda feedback: should_cache_feedback(feedback, settled),
+                                                       variant=plan["variant"])
+    else:
+        feedback = await compute(plan["text"])
+    if not is_cacheable_feedback(feedback):
+        return feedback
+    return finish_incremental(plan, feedback)
+
+async def analyze_uml_incremental_stream(session_key: str, xml_text: str, pages: list, lint: list = None,
+                                         stats: dict = None):
+    """
+    Streaming variant of analyze_uml_incremental: the reused class sections are yielded at once, then the
+    feedback for the re-analyzed classes token by token. The session is updated when the stream completes.
+    """
+    plan = plan_incremental(session_key, xml_text, pages, lint)
+    if not plan["structure"]["order"]:  # No classes to write sections for
+        async for token in analyze_uml_stream(xml_text, lint):
+            yield token
+        return
+    if stats is not None:
+        stats.update(incremental_stats(plan))
+    if not plan["classes"]:
+        yield finish_incremental(plan, "")
+        return
+
+    if plan["full"]:
+        cached = feedback_cache.get(plan["text"], plan["variant"])
+        if cached is not None:
+            yield finish_incremental(plan, cached)
+            return
+    else:
+        yield merge_sections(plan["structure"]["order"], plan["sections"], "") + "\n\n"
+
+    settled = index_settled()
+    matches = (await asyncio.to_thread(retrieve_prompt_matches, [plan["text"]]))[0]
+    prompt = assemble_prompt(plan["text"], matches, plan["lint"], plan["classes"], plan["other_classes"])
+    tokens = []
+    async for token in stream_groq(prompt.messages):
+        tokens.append(token)
+        yield token
+    feedback = "".join(tokens)
+    if plan["full"] and should_cache_feedback(feedback, settled):
+        feedback_cache.set(plan["text"], feedback, plan["variant"])
+    finish_incremental(plan, feedback)
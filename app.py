@@ -1,17 +1,39 @@
+import asyncio
+import json
+import logging
 import os
-import re
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 import uvicorn
-import xml.etree.ElementTree as ET
-from RAG import analyze_uml
-
-app = FastAPI()
+from telemetry import collect_spans, configure_logging, log_sampled, metrics_response, span, trace_request
+configure_logging()  # Before the modules below are imported, so that their log messages are formatted
+from batch import batch_jobs, read_diagrams_from_zip, shutdown_parse_pool, start_batch
+from drawio_parser import extract_uml_models_from_stream
+from RAG import (analyze_uml_cached, analyze_uml_incremental, analyze_uml_incremental_stream, analyze_uml_stream,
+                 feedback_cache, groq_client, index_ready, index_status, load_index, warm_up_index)
+from uml_lint import lint_uml_pages
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the retrieval index in the background: the server starts accepting requests right away,
+    # and analyses run without retrieved context until /readyz reports the index as loaded
+    app.state.index_warm_up = asyncio.create_task(warm_up_index())
+    yield
+    await groq_client.aclose()
+    shutdown_parse_pool()
+
+app = FastAPI(lifespan=lifespan)
 
 # Directory setup
-static_dir = r"Path_To Static_Directory"
-drawio_dir = r"Path_To_Draw.io_Directory"
+static_dir = os.environ.get("UMLIFY_STATIC_DIR", r"Path_To Static_Directory")
+drawio_dir = os.environ.get("UMLIFY_DRAWIO_DIR", r"Path_To_Draw.io_Directory")
 
 if not os.path.exists(static_dir):
     raise RuntimeError(f"Static directory '{static_dir}' does not exist.")
@@ -21,164 +43,209 @@ if not os.path.exists(drawio_dir):
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 app.mount("/drawio-26.1.0/drawio-26.1.0", StaticFiles(directory=drawio_dir), name="drawio")
 
+ALLOWED_EXTENSIONS = (".xml", ".drawio")
+
+def parse_and_lint(stream) -> tuple:
+    """
+    Parse an uploaded diagram into the simplified text format and run the rule-based lint over its model.
+    Returns (simplified_format, parsed pages, lint findings).
+    """
+    # Stream the upload through the incremental parser (handles multi-page and compressed diagrams)
+    with span("extract_uml_info"):
+        simplified_format, pages = extract_uml_models_from_stream(stream)
+    with span("lint_uml"):
+        findings = lint_uml_pages(pages)
+    return simplified_format, pages, findings
+
+def session_key(session_id: str, file: UploadFile):
+    """
+    Diagrams are tracked per session and file name; without a session ID every upload is analyzed as a whole.
+    """
+    return f"{session_id}\0{file.filename}" if session_id else None
+
 @app.get("/")
 async def read_root():
     return FileResponse(os.path.join(static_dir, "index.html"), headers={"Cache-Control": "no-cache, no-store, must-revalidate"})
 
-def extract_uml_info(xml_content: str) -> str:
+@app.post("/upload_xml")
+async def upload_xml(file: UploadFile = File(...), session_id: str = Form(None)):
+    """
+    Lint findings and AI feedback for a diagram. When a session_id is sent, re-uploads of the same file
+    only have their changed classes (and neighbours) analyzed again; "incremental" then reports which.
+    A file that cannot be parsed is answered with 400 and never sent to the model.
+    """
     try:
-        root = ET.fromstring(xml_content)
-        # Find the mxGraphModel (the uncompressed XML already contains this structure)
-        graph_model = root.find(".//mxGraphModel")
-        if graph_model is None:
-            raise ValueError("Missing mxGraphModel in XML.")
-
-        cells = graph_model.findall(".//mxCell")
-
-        elements = {}
-        relationships = []
-        multiplicities = {}
-        labels = {}
-
-        # Step 1: Identify classes and their attributes/methods
-        for cell in cells:
-            cell_id = cell.attrib.get("id")
-            value = cell.attrib.get("value", "")
-            style = cell.attrib.get("style", "")
-            parent = cell.attrib.get("parent")
-
-            # Check if it's a class (swimlane typically represents a class in draw.io UML)
-            if "swimlane" in style and value:
-                # Extract class name (first line before <br> or HTML tags)
-                class_name = re.sub(r"<[^>]+>", "", value.split("<")[0]).strip() if "<" in value else value.strip()
-                elements[cell_id] = {"type": "class", "name": class_name, "attributes": [], "methods": []}
-
-                # Find the child cell that contains attributes and methods (usually the first child with text style)
-                for child in cells:
-                    if child.attrib.get("parent") == cell_id and "text" in child.attrib.get("style", ""):
-                        child_value = child.attrib.get("value", "")
-                        if child_value:
-                            # Clean HTML tags and split by <div> or <br>
-                            clean_value = re.sub(r"<[^>]+>", "", child_value)  # Remove all HTML tags
-                            lines = [line.strip() for line in clean_value.split("\n") if line.strip()]
-
-                            # Separate attributes and methods
-                            for line in lines:
-                                # Determine if the line represents a method (contains parentheses)
-                                if "(" in line and ")" in line:
-                                    # This is a method
-                                    method_name = line.strip()
-                                    # Remove visibility prefix (+ or -) if present
-                                    if method_name.startswith("+") or method_name.startswith("-"):
-                                        method_name = method_name[1:].strip()
-                                    elements[cell_id]["methods"].append(method_name)
-                                else:
-                                    # This is an attribute
-                                    attr_name = line.strip()
-                                    # Remove visibility prefix (+ or -) if present
-                                    if attr_name.startswith("+") or attr_name.startswith("-"):
-                                        attr_name = attr_name[1:].strip()
-                                    elements[cell_id]["attributes"].append(attr_name)
-
-            # Check for multiplicity or relationship labels (text cells)
-            if "text" in style and "edgeStyle" not in style and value:
-                # Look for parent edge to associate this text with a relationship
-                for edge in cells:
-                    if edge.attrib.get("edge") == "1" and edge.attrib.get("id") == parent:
-                        if re.match(r"^(0|1|\*|\.\.)", value):  # Multiplicity (e.g., 0...*, 1...1)
-                            if edge.attrib.get("id") not in multiplicities:
-                                multiplicities[edge.attrib.get("id")] = {}
-                            # Determine if this multiplicity is near the source or target
-                            edge_source = edge.attrib.get("source")
-                            edge_target = edge.attrib.get("target")
-                            cell_geometry = cell.find("mxGeometry")
-                            edge_geometry = edge.find("mxGeometry")
-                            if cell_geometry is not None and edge_geometry is not None:
-                                cell_y = float(cell_geometry.attrib.get("y", 0))
-                                source_y = float(edge_geometry.find("mxPoint[@as='sourcePoint']").attrib.get("y", 0)) if edge_geometry.find("mxPoint[@as='sourcePoint']") is not None else float('inf')
-                                target_y = float(edge_geometry.find("mxPoint[@as='targetPoint']").attrib.get("y", 0)) if edge_geometry.find("mxPoint[@as='targetPoint']") is not None else float('inf')
-                                # Assign multiplicity to source or target based on proximity
-                                if abs(cell_y - source_y) < abs(cell_y - target_y):
-                                    multiplicities[edge.attrib.get("id")]["source"] = value
-                                else:
-                                    multiplicities[edge.attrib.get("id")]["target"] = value
-                        else:  # Relationship label (e.g., "Requests and receives ticket")
-                            labels[parent] = value
-
-        # Step 2: Identify relationships
-        for cell in cells:
-            cell_id = cell.attrib.get("id")
-            if cell.attrib.get("edge") == "1":
-                source = cell.attrib.get("source")
-                target = cell.attrib.get("target")
-                style = cell.attrib.get("style", "")
-                rel_type = "association"
-
-                # Determine relationship type based on style
-                if "endArrow=diamond" in style and "endFill=1" in style:
-                    rel_type = "aggregation"
-                elif "endArrow=block" in style and "endFill=0" in style:
-                    rel_type = "inheritance"
-                elif "endArrow=block" in style and "endFill=1" in style:
-                    rel_type = "composition"
-                elif "endArrow=none" in style and "dashed=1" in style:
-                    rel_type = "dependency"
-                elif "endArrow=open" in style or "endArrow=none" in style:
-                    rel_type = "association"
-
-                relationships.append({"from": source, "to": target, "type": rel_type, "id": cell_id})
-
-        # Step 3: Generate simplified text format
-        output = []
-        for eid, data in elements.items():
-            output.append(f"Class: {data['name']}")
-            if data["attributes"]:
-                output.append("Attributes:")
-                for attr in data["attributes"]:
-                    output.append(f"- {attr}")
-            if data["methods"]:
-                output.append("Methods:")
-                for method in data["methods"]:
-                    output.append(f"+ {method}")
-            output.append("")
-
-        for rel in relationships:
-            from_class = elements.get(rel["from"], {}).get("name", "Unknown")
-            to_class = elements.get(rel["to"], {}).get("name", "Unknown")
-            rel_label = labels.get(rel["id"], "")
-            multiplicity = multiplicities.get(rel["id"], {})
-            source_multiplicity = multiplicity.get("source", "N/A")
-            target_multiplicity = multiplicity.get("target", "N/A")
-            output.append(f"Relationship: {rel['type']} from {from_class} to {to_class} (Source Multiplicity: {source_multiplicity}, Target Multiplicity: {target_multiplicity}, Label: {rel_label})")
-
-        return "\n".join(output)
-
+        if not file.filename.endswith(ALLOWED_EXTENSIONS):
+            raise HTTPException(status_code=400, detail="Only .xml and .drawio files are allowed.")
+
+        with trace_request("/upload_xml"):
+            simplified_format, pages, findings = await run_in_threadpool(parse_and_lint, file.file)
+            log_sampled(logger, logging.DEBUG, "Simplified UML: %s", simplified_format)
+            if not pages:
+                raise HTTPException(status_code=400, detail=simplified_format)
+
+            key = session_key(session_id, file)
+            incremental = {}
+            if key:
+                feedback = await analyze_uml_incremental(key, simplified_format, pages, findings, incremental)
+            else:
+                feedback = await analyze_uml_cached(simplified_format, findings)
+            log_sampled(logger, logging.DEBUG, "Feedback from RAG: %s", feedback)
+        content = {"lint": findings, "feedback": feedback}
+        if incremental:
+            content["incremental"] = incremental
+        return JSONResponse(content=content)
+
+    except HTTPException as e:
+        return JSONResponse(content={"error": e.detail}, status_code=e.status_code)
     except Exception as e:
-        print("❌ Error parsing XML to extract UML info:", str(e))
-        return "Could not extract UML information."
+        logger.warning("Error processing XML file: %s", e)
+        return JSONResponse(content={"error": str(e)}, status_code=500)
 
-@app.post("/upload_xml")
-async def upload_xml(file: UploadFile = File(...)):
+@app.post("/lint")
+async def lint(file: UploadFile = File(...)):
+    """
+    Only the rule-based lint findings of a diagram (no retrieval or LLM call), in milliseconds.
+    """
     try:
-        if not file.filename.endswith(".xml"):
-            raise HTTPException(status_code=400, detail="Only XML files are allowed.")
-
-        content = await file.read()
-        xml_content = content.decode("utf-8")
+        if not file.filename.endswith(ALLOWED_EXTENSIONS):
+            raise HTTPException(status_code=400, detail="Only .xml and .drawio files are allowed.")
+        with trace_request("/lint"):
+            _, _, findings = await run_in_threadpool(parse_and_lint, file.file)
+        return JSONResponse(content={"lint": findings})
 
-        # Directly extract UML info from the uncompressed XML
-        simplified_format = extract_uml_info(xml_content)
-        print(f"Simplified UML: {simplified_format}")  # Debug print
+    except Exception as e:
+        logger.warning("Error linting XML file: %s", e)
+        return JSONResponse(content={"error": str(e)}, status_code=500)
 
-        feedback = analyze_uml(simplified_format)
-        print(f"Feedback from RAG: {feedback}")  # Debug print
-        return JSONResponse(content={"feedback": feedback})
+@app.post("/batch_upload")
+async def batch_upload(file: UploadFile = File(...)):
+    """
+    Accept a zip of .drawio/.xml diagrams and analyze them in the background.
+    Returns a job ID; poll /batch/{job_id} for per-file progress and feedback.
+    """
+    try:
+        if not file.filename.endswith(".zip"):
+            raise HTTPException(status_code=400, detail="Only .zip files are allowed.")
+        files = await run_in_threadpool(read_diagrams_from_zip, file.file)
+        job = start_batch(files)
+        return JSONResponse(content={"job_id": job.id, "total": len(files), "status_url": f"/batch/{job.id}"}, status_code=202)
+
+    except HTTPException as e:
+        return JSONResponse(content={"error": e.detail}, status_code=e.status_code)
+    except ValueError as e:
+        # Invalid archive, too many or too large diagrams (see read_diagrams_from_zip)
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    except Exception as e:
+        logger.warning("Error processing batch upload: %s", e)
+        return JSONResponse(content={"error": str(e)}, status_code=500)
 
+@app.get("/batch/{job_id}")
+async def batch_status(job_id: str):
+    job = batch_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": f"Unknown batch job '{job_id}'."}, status_code=404)
+    return JSONResponse(content=job.to_dict())
+
+@app.get("/cache_stats")
+async def cache_stats():
+    return JSONResponse(content=feedback_cache.stats())
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics: per-stage and end-to-end latency histograms and LLM token counts.
+    """
+    body, content_type = metrics_response()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness: the server is up (analyses work even while the retrieval index is loading).
+    """
+    return JSONResponse(content={"status": "ok"})
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: 200 once the retrieval index is loaded, 503 while it is loading or if it failed to load.
+    """
+    return JSONResponse(content=index_status(), status_code=200 if index_ready() else 503)
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/upload_xml/stream")
+async def upload_xml_stream(file: UploadFile = File(...), session_id: str = Form(None)):
+    """
+    Same analysis as /upload_xml, but the feedback is sent as Server-Sent Events while it is generated:
+    a "lint" event with the rule-based findings comes first, then "token" events carry text deltas, and a
+    final "done" event reports the time to the first token as ttfb_ms (the lint event comes earlier and reports its
+    own elapsed_ms) and the total latency (or an "error" event if the LLM call fails).
+    With a session_id, re-uploads are analyzed incrementally as in /upload_xml: the reused class feedback is
+    sent first, and "done" also reports the re-analyzed classes.
+    """
+    start = time.perf_counter()
+    try:
+        if not file.filename.endswith(ALLOWED_EXTENSIONS):
+            raise HTTPException(status_code=400, detail="Only .xml and .drawio files are allowed.")
+        # The generator below adds the parse and lint spans to its trace
+        with collect_spans() as parse_stages:
+            simplified_format, pages, findings = await run_in_threadpool(parse_and_lint, file.file)
+        if not pages:
+            raise HTTPException(status_code=400, detail=simplified_format)
+        lint_time = time.perf_counter() - start
+    except HTTPException as e:
+        return JSONResponse(content={"error": e.detail}, status_code=e.status_code)
     except Exception as e:
-        print("❌ Error processing XML file:", str(e))
+        logger.warning("Error processing XML file: %s", e)
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
+    key = session_key(session_id, file)
+    incremental = {}
+    if key:
+        feedback = analyze_uml_incremental_stream(key, simplified_format, pages, findings, incremental)
+    else:
+        feedback = analyze_uml_stream(simplified_format, findings)
+
+    async def events():
+        ttfb = None
+        # The generator runs after the endpoint has returned, so the trace starts here and is backdated
+        with trace_request("/upload_xml/stream", start) as trace:
+            trace["stages"].update(parse_stages)
+            yield sse_event("lint", {"findings": findings, "elapsed_ms": round(lint_time * 1000, 1)})
+            try:
+                async for token in feedback:
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - start
+                    yield sse_event("token", {"text": token})
+            except Exception as e:
+                logger.warning("Error streaming feedback: %s", e)
+                yield sse_event("error", {"error": str(e)})
+                return
+            total = time.perf_counter() - start
+            ttfb = total if ttfb is None else ttfb
+            trace["stages"]["ttfb"] = ttfb
+            done = {"ttfb_ms": round(ttfb * 1000, 1), "total_ms": round(total * 1000, 1)}
+            if incremental:
+                done["incremental"] = incremental
+            yield sse_event("done", done)
+
+    # X-Accel-Buffering stops reverse proxies such as nginx from holding back the stream
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 if __name__ == "__main__":
-    uvicorn.run("app:app", host="127.0.0.1", port=5500, reload=True)
+    workers = int(os.environ.get("UMLIFY_WORKERS", "1"))
+    if workers > 1:
+        # Build or refresh the index once in this process; workers only attach to it
+        load_index()
+        os.environ["UMLIFY_INDEX_MODE"] = "attach"
+        # Workers write their metrics to a shared directory so /metrics reports all of them
+        os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="umlify-metrics-"))
+        uvicorn.run("app:app", host="127.0.0.1", port=5500, workers=workers)
+    else:
+        uvicorn.run("app:app", host="127.0.0.1", port=5500, reload=True)
 
 #http://127.0.0.1:5500
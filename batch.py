@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from drawio_parser import extract_uml_models
+from RAG import (analyze_uml, feedback_cache, index_settled, is_cacheable_feedback, lint_variant,
+                 retrieve_prompt_matches, should_cache_feedback)
+from uml_lint import lint_uml_pages
+
+BATCH_MAX_FILES = int(os.environ.get("UMLIFY_BATCH_MAX_FILES", "500"))  # Diagrams accepted per zip
+BATCH_MAX_FILE_SIZE = 20 * 1024 * 1024  # Uncompressed bytes per diagram
+BATCH_PARSE_WORKERS = int(os.environ.get("UMLIFY_BATCH_PARSE_WORKERS", str(os.cpu_count() or 1)))
+BATCH_LLM_CONCURRENCY = int(os.environ.get("UMLIFY_BATCH_LLM_CONCURRENCY", "4"))  # LLM calls in flight per job
+BATCH_LLM_RATE = float(os.environ.get("UMLIFY_BATCH_LLM_RATE", "30"))  # LLM calls started per minute (0 = unlimited)
+BATCH_MAX_JOBS = 100  # Finished jobs kept for polling
+DIAGRAM_EXTENSIONS = (".drawio", ".xml")
+
+logger = logging.getLogger(__name__)
+
+_parse_pool = None
+
+
+def parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=BATCH_PARSE_WORKERS)
+    return _parse_pool
+
+
+def parse_and_lint(content: bytes) -> tuple:
+    """
+    (simplified text, whether any page was parsed, lint findings) of one diagram; runs in the parse pool.
+    Only the flag is sent back for the pages, which would otherwise be pickled across processes.
+    """
+    simplified, pages = extract_uml_models(content)
+    return simplified, bool(pages), lint_uml_pages(pages)
+
+
+def shutdown_parse_pool():
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(cancel_futures=True)
+        _parse_pool = None
+
+
+class RateLimiter:
+    """
+    Spaces out calls so that at most `per_minute` of them start every minute.
+    """
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class BatchJob:
+    """
+    State of one batch analysis, with per-file progress for polling.
+    """
+
+    def __init__(self, files: list):
+        self.id = uuid.uuid4().hex
+        self.created = time.time()
+        self.finished = None
+        self.status = "queued"
+        self.files = [{"name": name, "status": "queued", "lint": None, "feedback": None, "error": None}
+                      for name, _ in files]
+
+    def to_dict(self) -> dict:
+        done = sum(1 for entry in self.files if entry["status"] in ("done", "error"))
+        elapsed = (self.finished or time.time()) - self.created
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.files),
+            "completed": done,
+            "elapsed_seconds": round(elapsed, 2),
+            "files": self.files,
+        }
+
+
+# Jobs live in the memory of the worker process that runs them, so polling /batch/{job_id} needs a
+# single worker (with UMLIFY_WORKERS > 1 the poll may reach a worker that does not know the job)
+batch_jobs = {}
+_running = set()
+
+
+def read_diagrams_from_zip(stream) -> list:
+    """
+    Return [(name, bytes)] for every .drawio/.xml member of a zip archive.
+    Raises ValueError for archives that cannot be accepted (invalid, too many or too large diagrams).
+    """
+    files = []
+    try:
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or not name.endswith(DIAGRAM_EXTENSIONS) or "__MACOSX" in name:
+                    continue
+                if info.file_size > BATCH_MAX_FILE_SIZE:
+                    raise ValueError(f"'{name}' is larger than {BATCH_MAX_FILE_SIZE // (1024 * 1024)} MB.")
+                files.append((name, archive.read(info)))
+                if len(files) > BATCH_MAX_FILES:
+                    raise ValueError(f"A batch may contain at most {BATCH_MAX_FILES} diagrams.")
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"The file is not a valid zip archive: {e}") from e
+    if not files:
+        raise ValueError("The zip file contains no .drawio or .xml diagrams.")
+    return files
+
+
+async def run_batch(job: BatchJob, files: list):
+    """
+    Parse every diagram in the process pool, retrieve context for all of them at once,
+    then fan out the LLM calls under the batch concurrency and rate limits.
+    Diagrams that cannot be parsed are reported as errors and not sent to the model.
+    """
+    loop = asyncio.get_running_loop()
+    job.status = "parsing"
+    pool = parse_pool()
+
+    async def parse(position: int, content: bytes) -> str:
+        entry = job.files[position]
+        entry["status"] = "parsing"
+        simplified, has_pages, findings = await loop.run_in_executor(pool, parse_and_lint, content)
+        if not has_pages:
+            entry["status"] = "error"
+            entry["error"] = simplified
+            return None
+        # Lint findings are available for polling right away, long before the LLM feedback
+        entry["lint"] = findings
+        entry["status"] = "parsed"
+        return simplified
+
+    simplified_formats = await asyncio.gather(*(parse(position, content) for position, (_, content) in enumerate(files)))
+    parsed = [(position, simplified) for position, simplified in enumerate(simplified_formats) if simplified is not None]
+
+    job.status = "retrieving"
+    settled = index_settled()
+    matches = await asyncio.to_thread(retrieve_prompt_matches, [simplified for _, simplified in parsed])
+
+    job.status = "analyzing"
+    semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+    rate_limiter = RateLimiter(BATCH_LLM_RATE)
+
+    async def analyze(position: int, simplified: str, diagram_matches: list):
+        entry = job.files[position]
+        try:
+            async with semaphore:
+                async def compute(text: str) -> str:
+                    await rate_limiter.acquire()
+                    entry["status"] = "analyzing"
+                    return await analyze_uml(text, diagram_matches, entry["lint"])
+
+                feedback = await feedback_cache.get_or_compute(simplified, compute,
+                                                               lambda feedback: should_cache_feedback(feedback, settled),
+                                                               variant=lint_variant(entry["lint"]))
+            entry["feedback"] = feedback
+            entry["status"] = "done" if is_cacheable_feedback(feedback) else "error"
+            if entry["status"] == "error":
+                entry["error"] = feedback
+        except Exception as e:
+            logger.exception("Error analyzing '%s' in batch %s", entry["name"], job.id)
+            entry["status"] = "error"
+            entry["error"] = str(e)
+
+    await asyncio.gather(*(analyze(position, simplified, diagram_matches)
+                           for (position, simplified), diagram_matches in zip(parsed, matches)))
+    job.status = "done"
+    job.finished = time.time()
+    logger.info("Batch %s: %d diagrams analyzed in %.1f s", job.id, len(files), job.finished - job.created)
+
+
+def start_batch(files: list) -> BatchJob:
+    """
+    Register a job and run it in the background; returns immediately.
+    """
+    job = BatchJob(files)
+    batch_jobs[job.id] = job
+
+    # Forget the oldest finished jobs
+    finished = sorted((j for j in batch_jobs.values() if j.finished), key=lambda j: j.finished)
+    for old in finished[:max(len(finished) - BATCH_MAX_JOBS, 0)]:
+        del batch_jobs[old.id]
+
+    async def run():
+        try:
+            await run_batch(job, files)
+        except Exception:
+            logger.exception("Batch %s failed", job.id)
+            job.status = "error"
+            job.finished = time.time()
+
+    task = asyncio.get_running_loop().create_task(run())
+    _running.add(task)  # Keep a reference until the task is done
+    task.add_done_callback(_running.discard)
+    return job
@@ -0,0 +1,76 @@
+import os
+import socket
+import threading
+import time
+
+import uvicorn
+
+from benchmarks.corpus_generator import write_markdown_corpus
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_in_background(asgi_app, port: int = None):
+    """
+    Serve an ASGI app with uvicorn in a daemon thread. Returns (server, base URL); set
+    server.should_exit = True to stop it.
+    """
+    port = port or free_port()
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def prepare_app_environment(work_dir: str, llm_url: str, num_diagrams: int = 200):
+    """
+    Point app.py/RAG.py at a synthetic dataset, a scratch index and empty static directories
+    under work_dir, and at the given chat completions URL. Must run before importing app or RAG.
+    """
+    static_dir = os.path.join(work_dir, "static")
+    drawio_dir = os.path.join(work_dir, "drawio")
+    os.makedirs(static_dir, exist_ok=True)
+    os.makedirs(drawio_dir, exist_ok=True)
+    with open(os.path.join(static_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write("<html></html>")
+
+    os.environ.update({
+        "UMLIFY_DATASET_PATH": write_markdown_corpus(os.path.join(work_dir, "dataset"), num_diagrams),
+        "UMLIFY_INDEX_PATH": os.path.join(work_dir, "index"),
+        "UMLIFY_STATIC_DIR": static_dir,
+        "UMLIFY_DRAWIO_DIR": drawio_dir,
+        "GROQ_API_URL": llm_url,
+        "GROQ_API_KEY": "benchmark",
+    })
+
+
+def import_app():
+    """
+    Import app.py with the retrieval index already loaded (the app itself loads it in the background
+    at startup), so that every measured request gets retrieved context. Call prepare_app_environment first.
+    """
+    import app
+    import RAG
+
+    RAG.load_index()
+    return app
+
+
+async def read_timings(response, start: float) -> dict:
+    """
+    Read a streamed response to the end. Returns the seconds since `start` (a time.perf_counter() value)
+    to the first byte, to the first Server-Sent Event of each type ("lint", "token", ...) and to the end.
+    """
+    timings = {}
+    async for line in response.aiter_lines():
+        elapsed = time.perf_counter() - start
+        timings.setdefault("first_byte", elapsed)
+        if line.startswith("event:"):
+            timings.setdefault(line[len("event:"):].strip(), elapsed)
+    timings["total"] = time.perf_counter() - start
+    return timings
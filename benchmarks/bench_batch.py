@@ -0,0 +1,83 @@
+"""
+Throughput of a whole-class submission: N distinct diagrams uploaded one at a time through
+/upload_xml versus one zip through /batch_upload, against a fake LLM server with fixed latency.
+
+Run from the repository root:
+    python -m benchmarks.bench_batch [num_diagrams] [latency_seconds]
+"""
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+import httpx
+
+from benchmarks.app_env import import_app, prepare_app_environment
+from benchmarks.drawio_generator import generate_drawio_xml
+from benchmarks.fake_llm_server import start_server
+
+
+def make_diagrams(num_diagrams: int, seed: int) -> list:
+    return [(f"student{i}.drawio", generate_drawio_xml(12, seed=seed * 100000 + i).encode("utf-8")) for i in range(num_diagrams)]
+
+
+async def one_at_a_time(client: httpx.AsyncClient, diagrams: list) -> float:
+    start = time.perf_counter()
+    for name, content in diagrams:
+        response = await client.post("/upload_xml", files={"file": (name, content)})
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def as_batch(client: httpx.AsyncClient, diagrams: list) -> float:
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        for name, content in diagrams:
+            zf.writestr(name, content)
+
+    start = time.perf_counter()
+    response = await client.post("/batch_upload", files={"file": ("class.zip", archive.getvalue())})
+    response.raise_for_status()
+    status_url = response.json()["status_url"]
+    while True:
+        status = (await client.get(status_url)).json()
+        if status["status"] in ("done", "error"):
+            break
+        await asyncio.sleep(0.05)
+    assert all(entry["status"] == "done" for entry in status["files"]), status
+    return time.perf_counter() - start
+
+
+async def run(app, groq_client, num_diagrams: int):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://umlify", timeout=600) as client:
+        # Distinct diagrams per run so the feedback cache never short-circuits the LLM
+        sequential = await one_at_a_time(client, make_diagrams(num_diagrams, seed=1))
+        batched = await as_batch(client, make_diagrams(num_diagrams, seed=2))
+    await groq_client.aclose()
+    return sequential, batched
+
+
+def main():
+    num_diagrams = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        server, _, llm_url = start_server(latency=latency)
+        prepare_app_environment(work_dir, llm_url)
+        os.environ.setdefault("UMLIFY_BATCH_LLM_RATE", "0")
+        app = import_app()
+
+        sequential, batched = asyncio.run(run(app.app, app.groq_client, num_diagrams))
+        app.shutdown_parse_pool()
+        server.should_exit = True
+
+    print(f"{num_diagrams} diagrams, LLM latency {latency:.2f} s")
+    for label, elapsed in (("one at a time", sequential), ("batch", batched)):
+        print(f"{label:>14}: {elapsed:7.2f} s  {num_diagrams / elapsed * 60:8.1f} diagrams/minute")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Submit a diagram, then resubmit it with its cells shuffled and moved (layout-only changes),
+and compare the latency of the first (LLM) and repeated (cached) submissions.
+
+Run from the repository root:
+    python -m benchmarks.bench_cache [latency_seconds] [repeats]
+"""
+import asyncio
+import random
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+import httpx
+
+from benchmarks.app_env import import_app, prepare_app_environment
+from benchmarks.drawio_generator import generate_drawio_xml
+from benchmarks.fake_llm_server import start_server
+
+
+def relayout(xml_content: str, seed: int) -> bytes:
+    """
+    Shuffle the order of the cells and move every class, keeping the UML structure unchanged.
+    """
+    rng = random.Random(seed)
+    tree = ET.fromstring(xml_content)
+    root = tree.find(".//root")
+    cells = list(root)
+    head, rest = cells[:2], cells[2:]
+    rng.shuffle(rest)
+    for cell in cells:
+        root.remove(cell)
+    for cell in head + rest:
+        root.append(cell)
+        geometry = cell.find("mxGeometry")
+        if cell.attrib.get("id", "").startswith("class") and geometry is not None:
+            geometry.set("x", str(rng.randint(0, 2000)))
+            geometry.set("y", str(rng.randint(0, 2000)))
+    return ET.tostring(tree)
+
+
+async def run(app, groq_client, repeats: int):
+    original = generate_drawio_xml(10)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://umlify", timeout=60) as client:
+        async def submit(content: bytes) -> float:
+            start = time.perf_counter()
+            response = await client.post("/upload_xml", files={"file": ("diagram.drawio", content)})
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        first = await submit(original.encode("utf-8"))
+        repeated = [await submit(relayout(original, seed)) for seed in range(repeats)]
+        stats = (await client.get("/cache_stats")).json()
+    await groq_client.aclose()
+    return first, repeated, stats
+
+
+def main():
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        server, llm_app, llm_url = start_server(latency=latency)
+        prepare_app_environment(work_dir, llm_url)
+        app = import_app()
+
+        first, repeated, stats = asyncio.run(run(app.app, app.groq_client, repeats))
+        server.should_exit = True
+
+    repeated.sort()
+    print(f"First submission: {first * 1000:.1f} ms ({llm_app.state.stats['requests']} LLM request(s) in total)")
+    print(f"{repeats} reordered/moved resubmissions: median {repeated[len(repeated) // 2] * 1000:.1f} ms, "
+          f"max {repeated[-1] * 1000:.1f} ms")
+    print(f"Cache stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
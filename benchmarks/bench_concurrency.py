@@ -0,0 +1,68 @@
+"""
+Drive N concurrent /upload_xml requests against the app with a fake LLM server of fixed latency.
+With a non-blocking LLM client, N uploads finish in about one LLM latency instead of N.
+
+Run from the repository root:
+    python -m benchmarks.bench_concurrency [num_uploads] [latency_seconds]
+"""
+import asyncio
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.app_env import import_app, prepare_app_environment
+from benchmarks.drawio_generator import generate_drawio_xml
+from benchmarks.fake_llm_server import start_server
+
+
+async def upload(client: httpx.AsyncClient, content: bytes) -> float:
+    start = time.perf_counter()
+    response = await client.post("/upload_xml", files={"file": ("diagram.drawio", content)})
+    response.raise_for_status()
+    assert "feedback" in response.json(), response.text
+    return time.perf_counter() - start
+
+
+async def run(app, groq_client, num_uploads: int):
+    # A different diagram per upload, so that none of them is answered from the feedback cache
+    contents = [generate_drawio_xml(8, seed=seed).encode("utf-8") for seed in range(num_uploads + 1)]
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://umlify") as client:
+        sequential_start = time.perf_counter()
+        await upload(client, contents[-1])
+        single = time.perf_counter() - sequential_start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(upload(client, content) for content in contents[:-1]))
+        total = time.perf_counter() - start
+    await groq_client.aclose()
+    return single, total, latencies
+
+
+def main():
+    num_uploads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        server, llm_app, llm_url = start_server(latency=latency, fail_first=2)
+        prepare_app_environment(work_dir, llm_url)
+        app = import_app()
+
+        single, total, latencies = asyncio.run(run(app.app, app.groq_client, num_uploads))
+        stats = llm_app.state.stats
+        server.should_exit = True
+
+    print(f"LLM latency {latency:.2f} s, one upload {single:.2f} s")
+    print(f"{num_uploads} concurrent uploads: {total:.2f} s total, slowest {max(latencies):.2f} s "
+          f"(~{total / latency:.1f} LLM latencies, {num_uploads} if the event loop blocked)")
+    print(f"Fake LLM server: {stats['requests']} requests, {stats['failed']} rate-limited and retried, "
+          f"peak {stats['peak_in_flight']} in flight")
+    # Concurrent uploads must overlap at the LLM and finish in about one latency (plus retries), not N
+    if num_uploads > 1:
+        assert stats["peak_in_flight"] > 1, f"uploads did not overlap (peak {stats['peak_in_flight']} in flight)"
+        assert total < 2 * latency, f"{num_uploads} concurrent uploads took {total:.2f} s at {latency:.2f} s per LLM call"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Edit-resubmit loop: a diagram is uploaded, then one class at a time is edited and the diagram re-uploaded.
+Every re-upload is analyzed as a whole (under a new session_id each time, so that both modes produce the
+same per-class feedback) and incrementally (under one session_id, so only the edited classes and their
+neighbours go to the model). Reports latency and the prompt and completion tokens the fake LLM server
+received per re-upload, and writes them to JSON (see benchmarks/harness.py).
+
+Run from the repository root:
+    python -m benchmarks.bench_incremental [--classes 30] [--edits 10] [--latency 0.3] [--section-latency 0.1]
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.app_env import import_app, prepare_app_environment, serve_in_background
+from benchmarks.drawio_generator import generate_drawio_xml
+from benchmarks.fake_llm_server import start_server
+from benchmarks.harness import percentiles, save_results
+
+
+def edited_versions(num_classes: int, edits: int, seed: int = 0) -> list:
+    """
+    The original diagram followed by `edits` versions, each adding an attribute to one more random class.
+    """
+    rng = random.Random(seed)
+    xml_content = generate_drawio_xml(num_classes, seed=seed)
+    versions = [xml_content]
+    for step in range(edits):
+        edited = rng.randrange(num_classes)
+        member = f"attribute{edited}_0: String"
+        xml_content = xml_content.replace(member, f"{member}&#10;- revision{step}: int", 1)
+        versions.append(xml_content)
+    return versions
+
+
+def upload(client: httpx.Client, llm_stats: dict, content: str, session_id: str) -> dict:
+    prompt_tokens, completion_tokens = llm_stats["prompt_tokens"], llm_stats["completion_tokens"]
+    start = time.perf_counter()
+    response = client.post("/upload_xml", files={"file": ("diagram.drawio", content.encode("utf-8"))},
+                           data={"session_id": session_id})
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return {"latency": elapsed,
+            "prompt_tokens": llm_stats["prompt_tokens"] - prompt_tokens,
+            "completion_tokens": llm_stats["completion_tokens"] - completion_tokens,
+            "reanalyzed": len(response.json()["incremental"]["reanalyzed"])}
+
+
+def summarize(outcomes: list) -> dict:
+    return {
+        "latency": percentiles([outcome["latency"] for outcome in outcomes]),
+        "mean_ms": round(statistics.mean(outcome["latency"] for outcome in outcomes) * 1000, 2),
+        "prompt_tokens": round(statistics.mean(outcome["prompt_tokens"] for outcome in outcomes), 1),
+        "completion_tokens": round(statistics.mean(outcome["completion_tokens"] for outcome in outcomes), 1),
+        "reanalyzed_classes": round(statistics.mean(outcome["reanalyzed"] for outcome in outcomes), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--classes", type=int, default=30, help="Classes in the edited diagram")
+    parser.add_argument("--edits", type=int, default=10, help="Edit-resubmit rounds")
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds the fake LLM takes per completion")
+    parser.add_argument("--section-latency", type=float, default=0.1, help="Extra seconds per generated class section")
+    parser.add_argument("--corpus", type=int, default=200, help="Diagrams in the synthetic retrieval dataset")
+    parser.add_argument("--output", help="JSON file (default: benchmarks/results/incremental-<commit>.json)")
+    args = parser.parse_args()
+
+    versions = edited_versions(args.classes, args.edits)
+    with tempfile.TemporaryDirectory() as work_dir:
+        llm_server, llm_app, llm_url = start_server(latency=args.latency, section_latency=args.section_latency)
+        prepare_app_environment(work_dir, llm_url, args.corpus)
+        app = import_app()
+
+        server, base_url = serve_in_background(app.app)
+        results = {}
+        try:
+            with httpx.Client(base_url=base_url, timeout=600) as client:
+                outcomes = [upload(client, llm_app.state.stats, content, f"full-{position}")
+                            for position, content in enumerate(versions)]
+                results["full"] = summarize(outcomes[1:])
+                outcomes = [upload(client, llm_app.state.stats, content, "incremental") for content in versions]
+                results["incremental"] = summarize(outcomes[1:])
+        finally:
+            server.should_exit = llm_server.should_exit = True
+
+    full, incremental = results["full"], results["incremental"]
+    results["savings"] = {key: round(1 - incremental[key] / full[key], 4)
+                          for key in ("mean_ms", "prompt_tokens", "completion_tokens") if full[key]}
+    results["parameters"] = vars(args)
+    print(f"{args.classes} classes, {args.edits} edits, LLM latency {args.latency:.2f} s + {args.section_latency:.2f} s per section")
+    for mode in ("full", "incremental"):
+        summary = results[mode]
+        print(f"  {mode:<12} {summary['mean_ms']:>9.1f} ms  {summary['prompt_tokens']:>8.1f} prompt tokens  "
+              f"{summary['completion_tokens']:>8.1f} completion tokens  {summary['reanalyzed_classes']} classes re-analyzed")
+    print("  savings      " + "  ".join(f"{key} {saving:.1%}" for key, saving in results["savings"].items()))
+    save_results("incremental", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
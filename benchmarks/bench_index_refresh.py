@@ -0,0 +1,87 @@
+"""
+Incremental refresh of the persisted retrieval index against a full rebuild: a synthetic dataset is indexed,
+then files are deleted, edited and added, and the index is refreshed with UMLIndex.update. Checks that the
+refreshed index has the same vocabulary size and gives the same similarity scores as UMLIndex.build on the
+same directory (queries include the diagrams of the deleted and edited files, whose terms must no longer be
+weighted), and reports the time of both. Results go to JSON (see benchmarks/harness.py).
+
+Run from the repository root:
+    python -m benchmarks.bench_index_refresh [--files 2000] [--changes 20] [--output results.json]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.corpus_generator import generate_markdown_file, write_markdown_corpus
+from benchmarks.harness import save_results
+from uml_index import UMLIndex, read_uml_blocks
+
+
+def scores(index: UMLIndex, queries: list) -> list:
+    """
+    Similarity of every query to every diagram, sorted (row order differs between refreshed and rebuilt indexes).
+    """
+    return [np.sort(row.toarray().ravel()) for row in index.transform(queries) @ index.matrix.T]
+
+
+def change_dataset(dataset_path: str, changes: int, seed: int = 1) -> list:
+    """
+    Delete, edit and add `changes` files each. Returns the diagrams of the deleted and edited files.
+    """
+    rng = random.Random(seed)
+    names = sorted(os.listdir(dataset_path))
+    changed = rng.sample(names, 2 * changes)
+    removed = []
+    for position, name in enumerate(changed):
+        path = os.path.join(dataset_path, name)
+        removed.extend(read_uml_blocks(path))
+        if position < changes:
+            os.remove(path)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(generate_markdown_file(rng, f"Edited System {position}"))
+    for position in range(changes):
+        with open(os.path.join(dataset_path, f"Added System {position}.markdown"), "w", encoding="utf-8") as f:
+            f.write(generate_markdown_file(rng, f"Added System {position}"))
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--files", type=int, default=2000, help="Files in the synthetic dataset")
+    parser.add_argument("--changes", type=int, default=20, help="Files deleted, edited and added (each)")
+    parser.add_argument("--output", help="JSON file (default: benchmarks/results/index_refresh-<commit>.json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        dataset_path = write_markdown_corpus(os.path.join(work_dir, "dataset"), args.files)
+        index = UMLIndex.build(dataset_path)
+        queries = change_dataset(dataset_path, args.changes) + [index.diagrams[row] for row in range(20)]
+
+        start = time.perf_counter()
+        index.update(dataset_path)
+        update_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        rebuilt = UMLIndex.build(dataset_path)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        max_error = max(float(np.abs(refreshed - fresh).max())
+                        for refreshed, fresh in zip(scores(index, queries), scores(rebuilt, queries)))
+        results = {"update_ms": round(update_ms, 3), "build_ms": round(build_ms, 3),
+                   "vocabulary": {"refreshed": len(index.vocabulary), "rebuilt": len(rebuilt.vocabulary)},
+                   "max_score_error": max_error, "parameters": vars(args)}
+
+    print(f"{args.files} files, {args.changes} deleted, edited and added: refresh {update_ms:.1f} ms, rebuild {build_ms:.1f} ms")
+    print(f"vocabulary {len(index.vocabulary)} terms refreshed, {len(rebuilt.vocabulary)} rebuilt; "
+          f"largest score difference {max_error:.2e} over {len(queries)} queries")
+    save_results("index_refresh", results, args.output)
+    assert len(index.vocabulary) == len(rebuilt.vocabulary), "the refreshed index kept terms of removed diagrams"
+    assert max_error < 1e-9, f"refreshed and rebuilt scores differ by up to {max_error}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Check that extract_uml_info scales linearly with the number of mxCells,
+and that streaming an upload keeps peak memory below a full ElementTree parse.
+
+Run from the repository root:
+    python -m benchmarks.bench_parser
+"""
+import io
+import math
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from benchmarks.drawio_generator import generate_drawio_xml
+from drawio_parser import extract_uml_info, extract_uml_info_from_stream
+
+SIZES = [500, 1000, 2000, 4000, 8000]
+# Log-log slope of parse time against cell count: 1.0 is linear, a quadratic parser gives ~2.0
+MAX_SLOPE = 1.4
+
+
+def time_parse(xml_content: str, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract_uml_info(xml_content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func, *args) -> float:
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def compare_memory(num_classes: int = 8000):
+    content = generate_drawio_xml(num_classes).encode("utf-8")
+    streamed = peak_memory(extract_uml_info_from_stream, io.BytesIO(content))
+    full_tree = peak_memory(lambda: ET.fromstring(content.decode("utf-8")))
+    print(f"{len(content) / 1e6:.1f} MB upload: streaming parse peak {streamed / 1e6:.1f} MB, "
+          f"full ElementTree peak {full_tree / 1e6:.1f} MB (tree only)")
+
+
+def main():
+    points = []
+    for num_classes in SIZES:
+        xml_content = generate_drawio_xml(num_classes)
+        num_cells = len(ET.fromstring(xml_content).findall(".//mxCell"))
+        elapsed = time_parse(xml_content)
+        points.append((num_cells, elapsed))
+        print(f"{num_classes:>6} classes {num_cells:>7} cells {elapsed * 1000:9.1f} ms {elapsed / num_cells * 1e6:7.2f} us/cell")
+
+    (first_cells, first_time), (last_cells, last_time) = points[0], points[-1]
+    slope = math.log(last_time / first_time) / math.log(last_cells / first_cells)
+    print(f"Growth exponent: {slope:.2f}")
+    if slope > MAX_SLOPE:
+        raise SystemExit(f"❌ extract_uml_info grows as n^{slope:.2f} (limit n^{MAX_SLOPE}).")
+    print("✅ extract_uml_info scales linearly.")
+    compare_memory()
+
+
+if __name__ == "__main__":
+    main()
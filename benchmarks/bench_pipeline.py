@@ -0,0 +1,87 @@
+"""
+Microbenchmarks of the pipeline stages at growing sizes:
+extract_uml_info and convert_to_plantuml_format by number of classes, load_uml_dataset and the
+index build by number of dataset files, and retrieve_context by number of classes in the query.
+Results go to a JSON file (see benchmarks/harness.py to compare two runs).
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline [--classes 10 100 1000] [--files 100 1000] [--corpus 1000] [--output results.json]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.app_env import prepare_app_environment
+from benchmarks.corpus_generator import write_markdown_corpus
+from benchmarks.drawio_generator import generate_drawio_xml
+from benchmarks.harness import save_results, time_call
+from drawio_parser import extract_uml_info
+
+
+def bench_parsing(RAG, class_counts: list, attributes: int, methods: int) -> list:
+    results = []
+    for num_classes in class_counts:
+        xml_content = generate_drawio_xml(num_classes, attributes, methods)
+        simplified = extract_uml_info(xml_content)
+        extract = time_call(extract_uml_info, xml_content)
+        convert = time_call(RAG.convert_to_plantuml_format, simplified)
+        results.append({"classes": num_classes, "xml_bytes": len(xml_content),
+                        "extract_uml_info": extract, "convert_to_plantuml_format": convert})
+        print(f"{num_classes:>6} classes  extract_uml_info {extract['median_ms']:>10.3f} ms  "
+              f"convert_to_plantuml_format {convert['median_ms']:>9.3f} ms")
+    return results
+
+
+def bench_dataset(RAG, file_counts: list, work_dir: str) -> list:
+    from uml_index import UMLIndex
+
+    results = []
+    for num_files in file_counts:
+        dataset_path = write_markdown_corpus(os.path.join(work_dir, f"dataset-{num_files}"), num_files)
+        load = time_call(RAG.load_uml_dataset, dataset_path, repeat=3)
+        start = time.perf_counter()
+        UMLIndex.build(dataset_path)
+        build_ms = round((time.perf_counter() - start) * 1000, 3)
+        results.append({"files": num_files, "load_uml_dataset": load, "index_build_ms": build_ms})
+        print(f"{num_files:>6} files    load_uml_dataset {load['median_ms']:>10.3f} ms  index build {build_ms:>10.3f} ms")
+    return results
+
+
+def bench_retrieval(RAG, class_counts: list) -> list:
+    results = []
+    for num_classes in class_counts:
+        simplified = extract_uml_info(generate_drawio_xml(num_classes, seed=1))
+        retrieve = time_call(RAG.retrieve_context, simplified)
+        results.append({"classes": num_classes, "retrieve_context": retrieve})
+        print(f"{num_classes:>6} classes  retrieve_context {retrieve['median_ms']:>10.3f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--classes", type=int, nargs="+", default=[10, 100, 1000, 5000], help="Classes per diagram")
+    parser.add_argument("--attributes", type=int, default=3, help="Attributes per class")
+    parser.add_argument("--methods", type=int, default=3, help="Methods per class")
+    parser.add_argument("--files", type=int, nargs="+", default=[100, 1000, 5000], help="Dataset sizes for load_uml_dataset")
+    parser.add_argument("--corpus", type=int, default=1000, help="Indexed diagrams for retrieve_context")
+    parser.add_argument("--output", help="JSON file (default: benchmarks/results/pipeline-<commit>.json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        prepare_app_environment(work_dir, "http://127.0.0.1:9/v1/chat/completions", args.corpus)
+        import RAG
+        RAG.load_index()
+
+        results = {
+            "parameters": {"attributes": args.attributes, "methods": args.methods, "corpus": args.corpus,
+                           "retrieval_backend": RAG.RETRIEVAL_BACKEND},
+            "parsing": bench_parsing(RAG, args.classes, args.attributes, args.methods),
+            "dataset": bench_dataset(RAG, args.files, work_dir),
+            "retrieval": bench_retrieval(RAG, args.classes),
+        }
+    save_results("pipeline", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Prompt size of the token-budgeted assembler against the original build_prompt, for uploads of growing
+size, retrieving from the bundled md_UML_class_diagrams dataset. Token counts are estimates
+(prompt_builder.estimate_tokens); the fake LLM server and the Groq usage field give exact ones.
+
+Run from the repository root:
+    python -m benchmarks.bench_prompt [dataset_zip]
+"""
+import os
+import sys
+import tempfile
+import zipfile
+
+from benchmarks.drawio_generator import generate_drawio_xml
+from drawio_parser import extract_uml_info
+
+SIZES = [5, 15, 40, 100]
+DIAGRAMS_PER_SIZE = 10
+DATASET_ZIP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "md_UML_class_diagrams.zip")
+
+
+def main(dataset_zip: str):
+    work_dir = tempfile.mkdtemp(prefix="umlify-prompt-")
+    with zipfile.ZipFile(dataset_zip) as archive:
+        archive.extractall(work_dir)
+    os.environ["UMLIFY_DATASET_PATH"] = os.path.join(work_dir, "md_UML_class_diagrams")
+    os.environ["UMLIFY_INDEX_PATH"] = os.path.join(work_dir, "index")
+
+    import RAG
+    RAG.load_index()
+    from prompt_builder import estimate_tokens
+
+    print(f"{'classes':>8} {'build_prompt':>13} {'assembled':>10} {'saved':>7} {'context kept':>13}")
+    total_old = total_new = 0
+    for num_classes in SIZES:
+        old_tokens = new_tokens = kept = 0
+        for seed in range(DIAGRAMS_PER_SIZE):
+            simplified = extract_uml_info(generate_drawio_xml(num_classes, seed=seed))
+            old_tokens += estimate_tokens(RAG.build_prompt(simplified, RAG.retrieve_context(simplified, 3)))
+            prompt = RAG.prompt_assembler.assemble(simplified, RAG.retrieve_prompt_matches([simplified])[0])
+            new_tokens += prompt.token_count
+            kept += len(prompt.context_files)
+        total_old += old_tokens
+        total_new += new_tokens
+        print(f"{num_classes:>8} {old_tokens / DIAGRAMS_PER_SIZE:>13.0f} {new_tokens / DIAGRAMS_PER_SIZE:>10.0f} "
+              f"{1 - new_tokens / old_tokens:>7.1%} {kept / DIAGRAMS_PER_SIZE:>13.1f}")
+    print(f"Overall: {1 - total_new / total_old:.1%} fewer prompt tokens; the {RAG.prompt_assembler.instructions_tokens} "
+          f"instruction tokens are a static system message that prefix caching can reuse.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else DATASET_ZIP)
@@ -0,0 +1,60 @@
+"""
+Recall and latency of the retrieval backends on synthetic corpora of 1k, 10k and 100k diagrams.
+Recall@k is measured against the exact scores of the dense backend (a returned diagram counts as a
+hit if it scores at least as high as the exact k-th best, so ties are not penalized).
+
+Run from the repository root:
+    python -m benchmarks.bench_retrieval [sizes...]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.corpus_generator import generate_domain_diagram
+from retrieval import BACKENDS, create_backend
+from uml_index import UMLIndex
+
+SIZES = [1000, 10000, 100000]
+NUM_QUERIES = 50
+TOP_K = 3
+
+
+def build_index(num_diagrams: int, seed: int = 0) -> UMLIndex:
+    rng = random.Random(seed)
+    diagrams = [generate_domain_diagram(rng, f"Synthetic System {i}") for i in range(num_diagrams)]
+    return UMLIndex.from_diagrams(diagrams, [f"Synthetic System {i} UML Diagram.markdown" for i in range(num_diagrams)])
+
+
+def recall(results: list, exact: list) -> float:
+    hits = sum(int(np.sum(scores >= exact_scores[-1] - 1e-9)) for (_, scores), (_, exact_scores) in zip(results, exact))
+    return hits / sum(len(exact_scores) for _, exact_scores in exact)
+
+
+def main(sizes: list):
+    queries = [generate_domain_diagram(random.Random(10 ** 6 + i), "Student Submission") for i in range(NUM_QUERIES)]
+    print(f"{'diagrams':>9} {'backend':>8} {'setup s':>8} {'ms/query':>9} {'p95 ms':>8} {f'recall@{TOP_K}':>9}")
+    for num_diagrams in sizes:
+        index = build_index(num_diagrams)
+        exact = None
+        for name in BACKENDS:
+            start = time.perf_counter()
+            backend = create_backend(name, index)
+            setup = time.perf_counter() - start
+
+            # One query at a time, as retrieve_context sees them on /upload_xml
+            results, latencies = [], []
+            for query in queries:
+                start = time.perf_counter()
+                results.extend(backend.search([query], TOP_K))
+                latencies.append(time.perf_counter() - start)
+            if exact is None:
+                exact = results
+            latencies = np.asarray(latencies) * 1000
+            print(f"{num_diagrams:>9} {name:>8} {setup:>8.2f} {latencies.mean():>9.2f} "
+                  f"{np.percentile(latencies, 95):>8.2f} {recall(results, exact):>9.3f}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,121 @@
+"""
+Startup cost of the app: import time of app.py (with the heaviest imported modules, from python -X importtime),
+and, for a server started with uvicorn in a subprocess, the time until /healthz answers (the server accepts
+requests) and until /readyz reports the retrieval index as loaded. Measured with no index on disk (the index
+is built from the dataset), with a saved index, and with a dataset path that does not exist (the server must
+come up anyway and report the index as failed). Results go to JSON (see benchmarks/harness.py).
+
+Run from the repository root:
+    python -m benchmarks.bench_startup [--corpus 2000] [--output results.json]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.app_env import free_port, prepare_app_environment
+from benchmarks.harness import save_results
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOP_IMPORTS = 10  # Heaviest top-level modules reported
+
+
+def import_times() -> dict:
+    """
+    Wall time of `import app` and the cumulative import time of its heaviest top-level dependencies.
+    """
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=REPOSITORY,
+                               capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+
+    # Modules are listed after their own imports, two more spaces of indentation per level: the direct
+    # imports of app.py are the one-level entries printed since the previous top-level one
+    children, import_app_ms = {}, 0.0
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == "app":
+                import_app_ms = int(cumulative) / 1000
+                break
+            children = {}
+        elif depth == 1:
+            children[name.strip()] = int(cumulative) / 1000
+    heaviest = sorted(children.items(), key=lambda item: -item[1])[:TOP_IMPORTS]
+    return {"process_ms": round(wall * 1000, 1), "import_app_ms": round(import_app_ms, 1),
+            "heaviest_ms": {name: round(ms, 1) for name, ms in heaviest}}
+
+
+def wait_for(client: httpx.Client, path: str, start: float, timeout: float) -> float:
+    """
+    Seconds since `start` until `path` answers 200, or None on timeout or once the index failed to load.
+    """
+    while time.perf_counter() - start < timeout:
+        try:
+            response = client.get(path)
+            if response.status_code == 200:
+                return time.perf_counter() - start
+            if response.status_code == 503 and response.json().get("status") == "failed":
+                return None
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def server_startup(timeout: float = 300) -> dict:
+    """
+    Start uvicorn on app:app and time /healthz and /readyz from the moment the process is spawned.
+    """
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+                               cwd=REPOSITORY, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            live = wait_for(client, "/healthz", start, timeout)
+            ready = wait_for(client, "/readyz", start, timeout if live is not None else 0)
+            status = client.get("/readyz").json() if live is not None else {}
+    finally:
+        process.terminate()
+        process.wait()
+    return {"live_ms": round(live * 1000, 1) if live is not None else None,
+            "ready_ms": round(ready * 1000, 1) if ready is not None else None,
+            "index": status}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--corpus", type=int, default=2000, help="Diagrams in the synthetic retrieval dataset")
+    parser.add_argument("--output", help="JSON file (default: benchmarks/results/startup-<commit>.json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        prepare_app_environment(work_dir, "http://127.0.0.1:9/v1/chat/completions", args.corpus)
+        results = {"import": import_times()}
+        results["cold_start"] = server_startup()  # Builds the index, since none exists yet
+        results["warm_start"] = server_startup()
+        os.environ.update({"UMLIFY_DATASET_PATH": os.path.join(work_dir, "missing"),
+                           "UMLIFY_INDEX_PATH": os.path.join(work_dir, "missing-index")})
+        results["bad_dataset_path"] = server_startup(timeout=30)
+
+    results["parameters"] = vars(args)
+    print(f"import app: {results['import']['import_app_ms']} ms ({results['import']['process_ms']} ms with the interpreter)")
+    for name, ms in results["import"]["heaviest_ms"].items():
+        print(f"  {name:<30} {ms:>9.1f} ms")
+    for scenario in ("cold_start", "warm_start", "bad_dataset_path"):
+        outcome = results[scenario]
+        print(f"{scenario:<18} live after {outcome['live_ms']} ms, ready after {outcome['ready_ms']} ms, "
+              f"index {outcome['index'].get('status')}")
+    save_results("startup", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
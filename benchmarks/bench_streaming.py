@@ -0,0 +1,60 @@
+"""
+Compare time-to-first-token and total latency of /upload_xml and /upload_xml/stream
+against a fake LLM server that streams its completion over a fixed generation time.
+For the streaming endpoint, the time to its first byte (the "lint" event, sent before any
+feedback) is reported separately from the time to the first "token" event.
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming [latency_seconds]
+"""
+import asyncio
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.app_env import import_app, prepare_app_environment, read_timings, serve_in_background
+from benchmarks.drawio_generator import generate_drawio_xml
+from benchmarks.fake_llm_server import start_server
+
+
+async def measure(client: httpx.AsyncClient, path: str, content: bytes) -> dict:
+    start = time.perf_counter()
+    async with client.stream("POST", path, files={"file": ("diagram.drawio", content)}) as response:
+        response.raise_for_status()
+        timings = await read_timings(response, start)
+    # /upload_xml sends all of its feedback at once, at the end
+    timings.setdefault("token", timings["total"])
+    return timings
+
+
+async def run(base_url: str):
+    # A different diagram per endpoint, so the second request is not answered from the feedback cache
+    paths = ("/upload_xml", "/upload_xml/stream")
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        return {path: await measure(client, path, generate_drawio_xml(8, seed=seed).encode("utf-8"))
+                for seed, path in enumerate(paths)}
+
+
+def main():
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        llm_server, _, llm_url = start_server(latency=latency)
+        prepare_app_environment(work_dir, llm_url)
+        app = import_app()
+
+        # Serve the app over a real socket so streamed bytes reach the client as they are sent
+        server, base_url = serve_in_background(app.app)
+        results = asyncio.run(run(base_url))
+        server.should_exit = llm_server.should_exit = True
+
+    print(f"LLM generation time {latency:.2f} s")
+    for path, timings in results.items():
+        lint = f"lint {timings['lint'] * 1000:8.1f} ms" if "lint" in timings else " " * 16
+        print(f"{path:<20} {lint}   time to first token {timings['token'] * 1000:8.1f} ms   total {timings['total'] * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
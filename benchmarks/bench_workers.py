@@ -0,0 +1,97 @@
+"""
+Compare per-worker memory of the two ways a worker can get the retrieval index:
+
+- legacy: every worker reads the dataset into Python lists and fits its own TfidfVectorizer
+- attach: one process builds the index once, workers memory-map it read-only
+
+Each worker reports its RSS growth (private anonymous memory and file-backed shared pages)
+and its proportional set size while all workers are alive at the same time.
+
+Run from the repository root:
+    python -m benchmarks.bench_workers [num_diagrams] [num_workers]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+
+from benchmarks.corpus_generator import write_markdown_corpus
+
+QUERY = "class Customer {\n -customerId: String\n +createOrder(): void\n}\nCustomer --> Order"
+
+
+def read_memory() -> dict:
+    memory = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon:", "RssFile:", "RssShmem:")):
+                key, value = line.split(":")
+                memory[key] = int(value.split()[0])
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                memory["Pss"] = int(line.split()[1])
+    return memory
+
+
+def worker(mode: str, dataset_path: str, index_path: str, barrier, results):
+    # Import the heavy libraries first so the baseline only excludes the index itself
+    import numpy as np  # noqa: F401
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import linear_kernel
+    from uml_index import attach_index, read_uml_blocks
+
+    before = read_memory()
+    if mode == "legacy":
+        uml_diagrams, file_names = [], []
+        for file_name in os.listdir(dataset_path):
+            for block in read_uml_blocks(os.path.join(dataset_path, file_name)):
+                uml_diagrams.append(block)
+                file_names.append(file_name)
+        vectorizer = TfidfVectorizer()
+        tfidf_matrix = vectorizer.fit_transform(uml_diagrams)
+    else:
+        index = attach_index(index_path)
+        vectorizer, tfidf_matrix = index, index.matrix
+    linear_kernel(vectorizer.transform([QUERY]), tfidf_matrix)
+
+    barrier.wait()  # Measure while every worker holds its index
+    after = read_memory()
+    results.put({key: after[key] - before.get(key, 0) for key in ("RssAnon", "RssFile")} | {"Pss": after["Pss"]})
+    barrier.wait()
+
+
+def run(mode: str, dataset_path: str, index_path: str, num_workers: int) -> list:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(num_workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(mode, dataset_path, index_path, barrier, results)) for _ in range(num_workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return reports
+
+
+def main():
+    num_diagrams = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    num_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    from uml_index import load_or_build_index
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset_path = write_markdown_corpus(os.path.join(tmp, "dataset"), num_diagrams)
+        index_path = os.path.join(tmp, "index")
+        load_or_build_index(dataset_path, index_path)
+
+        print(f"{num_diagrams} diagrams, {num_workers} workers (KiB per worker, averaged)")
+        for mode in ("legacy", "attach"):
+            reports = run(mode, dataset_path, index_path, num_workers)
+            average = {key: sum(report[key] for report in reports) // len(reports) for key in reports[0]}
+            print(f"{mode:>7}: RssAnon +{average['RssAnon']:>8}  RssFile +{average['RssFile']:>8}  Pss {average['Pss']:>8}  "
+                  f"total Pss {sum(report['Pss'] for report in reports):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import random
+
+NOUNS = [
+    "Account", "Order", "Customer", "Ticket", "Invoice", "Payment", "Product", "Inventory", "Shipment", "Supplier",
+    "Employee", "Department", "Project", "Task", "Report", "Schedule", "Booking", "Room", "Hotel", "Flight",
+    "Passenger", "Vehicle", "Driver", "Route", "Station", "Library", "Book", "Member", "Loan", "Course",
+    "Student", "Teacher", "Exam", "Grade", "Patient", "Doctor", "Appointment", "Prescription", "Ward", "Animal",
+    "Habitat", "Volunteer", "Donation", "Event", "Venue", "Menu", "Recipe", "Ingredient", "Warehouse", "Cart",
+]
+TYPES = ["String", "int", "double", "boolean", "Date", "List<String>"]
+VERBS = ["create", "update", "delete", "get", "validate", "process", "assign", "cancel", "track", "notify"]
+ARROWS = ["-->", "--|>", "o-->", "*-->", "..>"]
+CARDINALITIES = ["1", "0..1", "0..*", "1..*"]
+# Two-word class names give large corpora a realistic vocabulary (NOUNS alone makes every term common)
+COMPOUND_NOUNS = [first + second for first in NOUNS for second in NOUNS if first != second]
+
+
+def generate_plantuml_diagram(rng: random.Random, num_classes: int = 5, title: str = "Synthetic System", nouns: list = NOUNS) -> str:
+    """
+    Generate one PlantUML class diagram in the style of the bundled dataset; class, attribute and
+    method names are drawn from `nouns`.
+    """
+    classes = rng.sample(nouns, num_classes)
+    lines = [f"@startuml {title}", ""]
+    for name in classes:
+        lines.append(f"class {name} {{")
+        for _ in range(rng.randint(2, 4)):
+            lines.append(f"  -{rng.choice(nouns).lower()}{rng.choice(['Id', 'Name', 'Date', 'Count', 'Status'])}: {rng.choice(TYPES)}")
+        for _ in range(rng.randint(2, 4)):
+            lines.append(f"  +{rng.choice(VERBS)}{rng.choice(nouns)}(): {rng.choice(['void', 'boolean', 'String'])}")
+        lines.append("}")
+        lines.append("")
+    for _ in range(num_classes):
+        source, target = rng.sample(classes, 2)
+        lines.append(f'{source} "{rng.choice(CARDINALITIES)}" {rng.choice(ARROWS)} "{rng.choice(CARDINALITIES)}" {target} : {rng.choice(VERBS)}s')
+    lines.append("")
+    lines.append("@enduml")
+    return "\n".join(lines)
+
+
+def generate_domain_diagram(rng: random.Random, title: str = "Synthetic System") -> str:
+    """
+    Generate a diagram whose names come from a small random domain of COMPOUND_NOUNS.
+    """
+    return generate_plantuml_diagram(rng, rng.randint(3, 7), title, nouns=rng.sample(COMPOUND_NOUNS, 8))
+
+
+def generate_markdown_file(rng: random.Random, title: str) -> str:
+    diagram = generate_plantuml_diagram(rng, rng.randint(3, 7), title)
+    return f"# {title} UML Class Diagram\n\n## Class Diagram Description\nSynthetic diagram.\n\n```plantuml\n{diagram}\n```\n"
+
+
+def write_markdown_corpus(dataset_path: str, num_files: int, seed: int = 0) -> str:
+    """
+    Write num_files synthetic .markdown files (one PlantUML block each) into dataset_path.
+    """
+    rng = random.Random(seed)
+    os.makedirs(dataset_path, exist_ok=True)
+    for i in range(num_files):
+        title = f"Synthetic System {i}"
+        with open(os.path.join(dataset_path, f"{title} UML Diagram.markdown"), "w", encoding="utf-8") as f:
+            f.write(generate_markdown_file(rng, title))
+    return dataset_path
@@ -0,0 +1,80 @@
+"""
+Synthetic uncompressed draw.io UML class diagrams of configurable size.
+
+Write one to a file:
+    python -m benchmarks.drawio_generator <classes> [attributes] [methods] [edges] > diagram.drawio
+"""
+import random
+import sys
+from xml.sax.saxutils import quoteattr
+
+CLASS_STYLE = "swimlane;fontStyle=1;align=center;verticalAlign=top;childLayout=stackLayout;horizontal=1;startSize=26;horizontalStack=0;resizeParent=1;resizeParentMax=0;resizeLast=0;collapsible=1;marginBottom=0;whiteSpace=wrap;html=1;"
+MEMBERS_STYLE = "text;strokeColor=none;fillColor=none;align=left;verticalAlign=top;spacingLeft=4;spacingRight=4;overflow=hidden;rotatable=0;points=[[0,0.5],[1,0.5]];portConstraint=eastwest;whiteSpace=wrap;html=1;"
+LABEL_STYLE = "text;html=1;align=center;verticalAlign=middle;resizable=0;points=[];"
+EDGE_STYLES = [
+    "endArrow=open;endFill=1;html=1;rounded=0;",
+    "endArrow=diamond;endFill=1;html=1;rounded=0;",
+    "endArrow=block;endFill=0;html=1;rounded=0;",
+    "endArrow=block;endFill=1;html=1;rounded=0;",
+    "endArrow=none;dashed=1;html=1;rounded=0;",
+]
+MULTIPLICITIES = ["0..*", "1", "1..*", "0..1", "*"]
+
+
+def _cell(cell_id, value="", style="", parent="1", extra="", geometry=""):
+    return f'<mxCell id="{cell_id}" value={quoteattr(value)} style={quoteattr(style)} parent="{parent}"{extra}>{geometry}</mxCell>'
+
+
+def generate_drawio_xml(num_classes: int, attributes_per_class: int = 3, methods_per_class: int = 3,
+                        num_edges: int = None, labelled_edges: float = 0.5, seed: int = 0) -> str:
+    """
+    Generate a synthetic uncompressed draw.io UML class diagram.
+    Each class produces two cells and each edge one cell plus up to three label cells.
+    """
+    rng = random.Random(seed)
+    if num_edges is None:
+        num_edges = num_classes
+
+    cells = ['<mxCell id="0"/>', '<mxCell id="1" parent="0"/>']
+    for i in range(num_classes):
+        x, y = (i % 20) * 200, (i // 20) * 200
+        members = [f"- attribute{i}_{a}: String" for a in range(attributes_per_class)]
+        members += [f"+ method{i}_{m}(arg: int): void" for m in range(methods_per_class)]
+        cells.append(_cell(f"class{i}", f"Class{i}", CLASS_STYLE, extra=' vertex="1"',
+                           geometry=f'<mxGeometry x="{x}" y="{y}" width="160" height="120" as="geometry"/>'))
+        cells.append(_cell(f"members{i}", "\n".join(members), MEMBERS_STYLE,
+                           parent=f"class{i}", extra=' vertex="1"',
+                           geometry='<mxGeometry y="26" width="160" height="94" as="geometry"/>'))
+
+    for e in range(num_edges):
+        source, target = rng.randrange(num_classes), rng.randrange(num_classes)
+        source_y, target_y = rng.randint(0, 4000), rng.randint(0, 4000)
+        cells.append(_cell(
+            f"edge{e}", "", rng.choice(EDGE_STYLES),
+            extra=f' edge="1" source="class{source}" target="class{target}"',
+            geometry=(f'<mxGeometry relative="1" as="geometry">'
+                      f'<mxPoint x="0" y="{source_y}" as="sourcePoint"/>'
+                      f'<mxPoint x="0" y="{target_y}" as="targetPoint"/></mxGeometry>'),
+        ))
+        if rng.random() < labelled_edges:
+            cells.append(_cell(f"label{e}", f"relates to {e}", LABEL_STYLE, parent=f"edge{e}",
+                               extra=' vertex="1" connectable="0"',
+                               geometry='<mxGeometry x="0" y="0" relative="1" as="geometry"/>'))
+            for role, point_y in (("s", source_y), ("t", target_y)):
+                cells.append(_cell(f"mult{role}{e}", rng.choice(MULTIPLICITIES), LABEL_STYLE, parent=f"edge{e}",
+                                   extra=' vertex="1" connectable="0"',
+                                   geometry=f'<mxGeometry x="0" y="{point_y + 5}" relative="1" as="geometry"/>'))
+
+    return (
+        '<mxfile host="UMLify-benchmark"><diagram id="synthetic" name="Page-1">'
+        '<mxGraphModel dx="1000" dy="1000" grid="1" gridSize="10"><root>'
+        + "".join(cells)
+        + "</root></mxGraphModel></diagram></mxfile>"
+    )
+
+
+if __name__ == "__main__":
+    if not 2 <= len(sys.argv) <= 5:
+        raise SystemExit("Usage: python -m benchmarks.drawio_generator <classes> [attributes] [methods] [edges]")
+    counts = [int(arg) for arg in sys.argv[1:]]
+    sys.stdout.write(generate_drawio_xml(*counts[:3], num_edges=counts[3] if len(counts) == 4 else None))
@@ -0,0 +1,143 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions endpoint with configurable latency.
+
+Run standalone:
+    python -m benchmarks.fake_llm_server --port 8765 --latency 1.0
+and point the app at it with GROQ_API_URL=http://127.0.0.1:8765/v1/chat/completions
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.app_env import serve_in_background
+
+FEEDBACK = "### 1. Classes & Attributes:\n- Synthetic feedback from the fake LLM server."
+SECTION_FEEDBACK = "- Synthetic feedback for this class from the fake LLM server, covering its members and relationships."
+CLASSES_RE = re.compile(r"^## Classes to Analyze:\n(.+)$", re.MULTILINE)
+
+
+def feedback_for(payload: dict) -> tuple:
+    """
+    (completion text, number of sections): one "## Class: <Name>" section per class of a sectioned
+    (incremental) prompt plus an overall section, or FEEDBACK.
+    """
+    match = CLASSES_RE.search(payload["messages"][-1]["content"])
+    if match is None:
+        return FEEDBACK, 1
+    names = match.group(1).split(", ")
+    sections = [f"## Class: {name}\n{SECTION_FEEDBACK}" for name in names]
+    sections.append("## Overall\n- Synthetic overall feedback from the fake LLM server.")
+    return "\n\n".join(sections), len(sections)
+
+
+def usage_for(payload: dict, feedback: str = FEEDBACK) -> dict:
+    prompt = "".join(message["content"] for message in payload["messages"])
+    return {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(feedback) // 4,
+            "total_tokens": (len(prompt) + len(feedback)) // 4}
+
+
+def stream_chunks(model: str, latency: float, first_token_latency: float, usage: dict = None, feedback: str = FEEDBACK):
+    """
+    Emit the feedback word by word as chat.completion.chunk events: the first token after
+    first_token_latency, the rest spread evenly so the whole stream takes `latency`.
+    A final chunk without choices carries `usage` if given (stream_options.include_usage).
+    """
+    words = [word + " " for word in feedback.split(" ")]
+    interval = max(latency - first_token_latency, 0) / max(len(words) - 1, 1)
+
+    async def chunks():
+        await asyncio.sleep(first_token_latency)
+        for position, word in enumerate(words):
+            if position:
+                await asyncio.sleep(interval)
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+        if usage is not None:
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [], "usage": usage}
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return chunks()
+
+
+def create_app(latency: float = 1.0, fail_first: int = 0, fail_status: int = 429, first_token_latency: float = None,
+               section_latency: float = 0.0) -> FastAPI:
+    """
+    Build the fake server. The first `fail_first` requests are answered with `fail_status`.
+    Streaming requests get their first token after `first_token_latency` (default: a tenth of `latency`).
+    Sectioned prompts take `section_latency` longer per generated section, as output length drives real latency.
+    Request counts, the peak number of concurrent requests and token totals are kept in app.state.stats.
+    """
+    if first_token_latency is None:
+        first_token_latency = latency / 10
+    app = FastAPI()
+    app.state.stats = {"requests": 0, "in_flight": 0, "peak_in_flight": 0, "failed": 0,
+                       "prompt_tokens": 0, "completion_tokens": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        stats = app.state.stats
+        payload = await request.json()
+        stats["requests"] += 1
+        if stats["failed"] < fail_first:
+            stats["failed"] += 1
+            return JSONResponse({"error": {"message": "rate limited"}}, status_code=fail_status, headers={"Retry-After": "0"})
+
+        feedback, num_sections = feedback_for(payload)
+        usage = usage_for(payload, feedback)
+        stats["prompt_tokens"] += usage["prompt_tokens"]
+        stats["completion_tokens"] += usage["completion_tokens"]
+        completion_latency = latency + section_latency * num_sections
+        if payload.get("stream"):
+            include_usage = (payload.get("stream_options") or {}).get("include_usage")
+            return StreamingResponse(stream_chunks(payload.get("model", "fake"), completion_latency, first_token_latency,
+                                                   usage if include_usage else None, feedback),
+                                     media_type="text/event-stream")
+
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        try:
+            await asyncio.sleep(completion_latency)
+        finally:
+            stats["in_flight"] -= 1
+
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": feedback}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    return app
+
+
+def start_server(port: int = None, **options):
+    """
+    Start the fake server in a background thread. Returns (server, app, chat completions URL).
+    """
+    app = create_app(**options)
+    server, base_url = serve_in_background(app, port)
+    return server, app, f"{base_url}/v1/chat/completions"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds before each completion is returned")
+    parser.add_argument("--fail-first", type=int, default=0, help="answer the first N requests with --fail-status")
+    parser.add_argument("--fail-status", type=int, default=429)
+    parser.add_argument("--first-token-latency", type=float, default=None, help="seconds before the first streamed token")
+    parser.add_argument("--section-latency", type=float, default=0.0, help="extra seconds per section of sectioned prompts")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency, args.fail_first, args.fail_status, args.first_token_latency, args.section_latency),
+                host="127.0.0.1", port=args.port)
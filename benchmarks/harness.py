@@ -0,0 +1,135 @@
+"""
+Shared timing and JSON result helpers for the benchmarks, plus a comparison of two result files.
+
+Compare two runs (e.g. before and after a commit):
+    python -m benchmarks.harness old.json new.json [threshold]
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Relative slowdown of a *_ms / *_seconds metric that compare() reports as a regression
+REGRESSION_THRESHOLD = 0.10
+
+
+def time_call(func, *args, repeat: int = 5, min_time: float = 0.05) -> dict:
+    """
+    Time func(*args): every sample runs it enough times to take at least min_time seconds.
+    Returns per-call best and median in milliseconds.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func(*args)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func(*args)
+        samples.append((time.perf_counter() - start) / number)
+    return {"best_ms": round(min(samples) * 1000, 4), "median_ms": round(statistics.median(samples) * 1000, 4)}
+
+
+def percentiles(latencies: list) -> dict:
+    """
+    p50/p90/p99/max in milliseconds for a list of latencies in seconds.
+    """
+    ordered = sorted(latencies)
+    if not ordered:
+        return {}
+
+    def at(fraction: float) -> float:
+        return round(ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000, 2)
+
+    return {"p50_ms": at(0.50), "p90_ms": at(0.90), "p99_ms": at(0.99), "max_ms": round(ordered[-1] * 1000, 2)}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(RESULTS_DIR), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(name: str, results: dict, path: str = None) -> str:
+    """
+    Write results with the commit and environment they were measured on, to `path` or
+    benchmarks/results/<name>-<commit>.json. Returns the file path.
+    """
+    revision = git_revision()
+    document = {
+        "benchmark": name,
+        "commit": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{name}-{revision}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {path}")
+    return path
+
+
+def _flatten(value, prefix: str = "") -> dict:
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(value, list):
+        flat = {}
+        for position, item in enumerate(value):
+            flat.update(_flatten(item, f"{prefix}[{position}]"))
+        return flat
+    return {prefix: value} if isinstance(value, (int, float)) and not isinstance(value, bool) else {}
+
+
+def compare(old_path: str, new_path: str, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """
+    Print every timing metric (keys ending in _ms or _seconds) of two result files side by side.
+    Returns the metrics that got slower by more than `threshold`.
+    """
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    old_metrics, new_metrics = _flatten(old["results"]), _flatten(new["results"])
+
+    print(f"{old['benchmark']}: {old['commit']} -> {new['commit']}")
+    regressions = []
+    for key in sorted(old_metrics.keys() & new_metrics.keys()):
+        if not key.endswith(("_ms", "_seconds")) or not old_metrics[key]:
+            continue
+        change = new_metrics[key] / old_metrics[key] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  ❌ slower"
+            regressions.append(key)
+        elif change < -threshold:
+            flag = "  ✅ faster"
+        print(f"{key:<70} {old_metrics[key]:>12.3f} {new_metrics[key]:>12.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        raise SystemExit("Usage: python -m benchmarks.harness <old.json> <new.json> [threshold]")
+    if compare(sys.argv[1], sys.argv[2], float(sys.argv[3]) if len(sys.argv) == 4 else REGRESSION_THRESHOLD):
+        raise SystemExit(1)
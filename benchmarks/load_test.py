@@ -0,0 +1,141 @@
+"""
+End-to-end load test: the FastAPI app is served over a real socket against the fake chat completions
+server, and a fixed number of uploads is sent with bounded concurrency. Reports throughput, latency
+percentiles (and, for the streaming endpoint, the time to the "lint" event and to the first "token" event), the server-side per-stage means from
+/metrics, and writes everything to JSON (see benchmarks/harness.py to compare two runs).
+
+Run from the repository root:
+    python -m benchmarks.load_test [--requests 200] [--concurrency 16] [--latency 1.0] [--endpoint stream]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.app_env import import_app, prepare_app_environment, read_timings, serve_in_background
+from benchmarks.drawio_generator import generate_drawio_xml
+from benchmarks.fake_llm_server import start_server
+from benchmarks.harness import percentiles, save_results
+
+ENDPOINTS = {"upload_xml": "/upload_xml", "stream": "/upload_xml/stream"}
+
+
+def make_uploads(num_requests: int, unique: float, num_classes: int) -> list:
+    """
+    Diagram contents for each request; only a `unique` fraction are distinct, the rest repeat them
+    (and are answered from the feedback cache).
+    """
+    distinct = max(1, round(num_requests * unique))
+    diagrams = [generate_drawio_xml(num_classes, seed=seed).encode("utf-8") for seed in range(distinct)]
+    return [diagrams[position % distinct] for position in range(num_requests)]
+
+
+async def send(client: httpx.AsyncClient, path: str, content: bytes) -> dict:
+    start = time.perf_counter()
+    timings = {}
+    try:
+        async with client.stream("POST", path, files={"file": ("diagram.drawio", content)}) as response:
+            timings = await read_timings(response, start)
+            ok = response.status_code == 200
+    except httpx.HTTPError:
+        ok = False
+    return {"ok": ok, "latency": time.perf_counter() - start, "lint": timings.get("lint"), "ttft": timings.get("token")}
+
+
+def stage_means(metrics_text: str) -> dict:
+    """
+    Mean milliseconds per stage and mean tokens per LLM call from the app's Prometheus metrics.
+    """
+    sums, counts = {}, {}
+    for family in text_string_to_metric_families(metrics_text):
+        if family.name not in ("umlify_stage_seconds", "umlify_llm_tokens"):
+            continue
+        for sample in family.samples:
+            label = sample.labels.get("stage") or sample.labels.get("kind")
+            if sample.name.endswith("_sum"):
+                sums[(family.name, label)] = sample.value
+            elif sample.name.endswith("_count"):
+                counts[(family.name, label)] = sample.value
+
+    means = {"stages": {}, "tokens": {}}
+    for (name, label), total in sums.items():
+        count = counts.get((name, label))
+        if not count:
+            continue
+        if name == "umlify_stage_seconds":
+            means["stages"][f"{label}_ms"] = round(total / count * 1000, 3)
+        else:
+            means["tokens"][f"{label}_tokens"] = round(total / count, 1)
+    return means
+
+
+async def run(base_url: str, path: str, uploads: list, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=600, limits=limits) as client:
+        async def bounded(content: bytes) -> dict:
+            async with semaphore:
+                return await send(client, path, content)
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(bounded(content) for content in uploads))
+        elapsed = time.perf_counter() - start
+        metrics_text = (await client.get("/metrics")).text
+
+    succeeded = [outcome for outcome in outcomes if outcome["ok"]]
+    return {
+        "requests": len(outcomes),
+        "errors": len(outcomes) - len(succeeded),
+        "wall_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(succeeded) / elapsed, 2),
+        "latency": percentiles([outcome["latency"] for outcome in succeeded]),
+        "lint": percentiles([outcome["lint"] for outcome in succeeded if outcome["lint"] is not None]),
+        "ttft": percentiles([outcome["ttft"] for outcome in succeeded if outcome["ttft"] is not None]),
+        "server": stage_means(metrics_text),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once")
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds the fake LLM takes per completion")
+    parser.add_argument("--first-token-latency", type=float, default=None, help="Seconds to the first streamed token")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="upload_xml")
+    parser.add_argument("--classes", type=int, default=8, help="Classes per uploaded diagram")
+    parser.add_argument("--unique", type=float, default=1.0, help="Fraction of distinct diagrams (the rest hit the cache)")
+    parser.add_argument("--corpus", type=int, default=200, help="Diagrams in the synthetic retrieval dataset")
+    parser.add_argument("--output", help="JSON file (default: benchmarks/results/load-<commit>.json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        llm_server, llm_app, llm_url = start_server(latency=args.latency, first_token_latency=args.first_token_latency)
+        prepare_app_environment(work_dir, llm_url, args.corpus)
+        app = import_app()
+
+        server, base_url = serve_in_background(app.app)
+        try:
+            uploads = make_uploads(args.requests, args.unique, args.classes)
+            results = asyncio.run(run(base_url, ENDPOINTS[args.endpoint], uploads, args.concurrency))
+        finally:
+            server.should_exit = llm_server.should_exit = True
+
+    results["parameters"] = vars(args)
+    results["llm"] = {"requests": llm_app.state.stats["requests"], "peak_in_flight": llm_app.state.stats["peak_in_flight"]}
+    latency = results["latency"]
+    print(f"{results['requests']} requests to {ENDPOINTS[args.endpoint]}, {args.concurrency} concurrent, "
+          f"LLM latency {args.latency:.2f} s: {results['throughput_rps']} req/s, "
+          f"p50 {latency.get('p50_ms')} ms, p99 {latency.get('p99_ms')} ms, {results['errors']} errors")
+    if results["ttft"]:
+        print(f"  lint event p50 {results['lint'].get('p50_ms')} ms, first token p50 {results['ttft'].get('p50_ms')} ms, "
+              f"p99 {results['ttft'].get('p99_ms')} ms")
+    for stage, mean in results["server"]["stages"].items():
+        print(f"  {stage:<34} {mean:>10.3f}")
+    save_results("load", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import base64
+import functools
+import logging
+import re
+import xml.etree.ElementTree as ET
+import zlib
+from urllib.parse import unquote_to_bytes
+
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+MULTIPLICITY_RE = re.compile(r"^(0|1|\*|\.\.)")
+CHUNK_SIZE = 64 * 1024  # Bytes fed to the incremental XML parser at a time
+
+logger = logging.getLogger(__name__)
+
+
+def parse_style(style: str) -> dict:
+    """
+    Parse a draw.io style string (e.g. "swimlane;endArrow=block;endFill=0;") into a dict.
+    Bare tokens such as "swimlane" or "text" are stored with an empty string value.
+    """
+    style_map = {}
+    for token in style.split(";"):
+        if not token:
+            continue
+        key, sep, value = token.partition("=")
+        style_map[key.strip()] = value.strip() if sep else ""
+    return style_map
+
+
+# Cells share a handful of style strings, so parsed styles are cached and shared read-only between cells
+_cached_style = functools.lru_cache(maxsize=4096)(parse_style)
+
+
+def has_style(style_map: dict, name: str) -> bool:
+    """
+    Check whether a style name is set either as a bare token or through "shape=<name>".
+    """
+    return name in style_map or style_map.get("shape") == name
+
+
+def classify_edge(style_map: dict) -> str:
+    """
+    Determine the UML relationship type of an edge from its parsed style.
+    """
+    end_arrow = style_map.get("endArrow")
+    end_fill = style_map.get("endFill")
+
+    if end_arrow == "diamond" and end_fill == "1":
+        return "aggregation"
+    elif end_arrow == "block" and end_fill == "0":
+        return "inheritance"
+    elif end_arrow == "block" and end_fill == "1":
+        return "composition"
+    elif end_arrow == "none" and style_map.get("dashed") == "1":
+        return "dependency"
+    return "association"
+
+
+VISIBILITY_MARKERS = {"+": "public", "-": "private", "#": "protected", "~": "package"}
+
+
+def _strip_visibility(line: str) -> str:
+    # Remove visibility prefix (+ or -) if present
+    if line.startswith("+") or line.startswith("-"):
+        return line[1:].strip()
+    return line
+
+
+def _visibility(line: str):
+    return VISIBILITY_MARKERS.get(line[:1])
+
+
+class Cell:
+    """
+    Compact record of the mxCell fields the UML parser needs, so the XML element can be freed right away.
+    """
+    __slots__ = ("id", "value", "style", "parent", "is_edge", "source", "target",
+                 "geometry_y", "source_point_y", "target_point_y")
+
+    def __init__(self, element):
+        attrib = element.attrib
+        self.id = attrib.get("id")
+        self.value = attrib.get("value", "")
+        self.style = _cached_style(attrib.get("style", ""))
+        self.parent = attrib.get("parent")
+        self.is_edge = attrib.get("edge") == "1"
+        self.source = attrib.get("source")
+        self.target = attrib.get("target")
+        self.geometry_y = self.source_point_y = self.target_point_y = None
+
+        geometry = element.find("mxGeometry")
+        if geometry is not None:
+            self.geometry_y = geometry.attrib.get("y", 0)
+            for point in geometry.iterfind("mxPoint"):
+                role = point.attrib.get("as")
+                if role == "sourcePoint" and self.source_point_y is None:
+                    self.source_point_y = point.attrib.get("y", 0)
+                elif role == "targetPoint" and self.target_point_y is None:
+                    self.target_point_y = point.attrib.get("y", 0)
+
+
+def _point_y(value) -> float:
+    return float(value) if value is not None else float("inf")
+
+
+def parse_uml_model(cells) -> dict:
+    """
+    Build the UML model (classes, relationships, multiplicities and labels) from the cells of one page.
+    Cells are indexed by id and by parent in a single pass, so the whole parse is linear in the cell count.
+    """
+    cells = list(cells)
+    cells_by_id = {}
+    children = {}
+    for cell in cells:
+        cells_by_id[cell.id] = cell
+        children.setdefault(cell.parent, []).append(cell)
+
+    elements = {}
+    relationships = []
+    multiplicities = {}
+    labels = {}
+
+    for cell in cells:
+        value = cell.value
+        style_map = cell.style
+
+        # Check if it's a class (swimlane typically represents a class in draw.io UML)
+        if has_style(style_map, "swimlane") and value:
+            # Extract class name (first line before <br> or HTML tags)
+            class_name = HTML_TAG_RE.sub("", value.split("<")[0]).strip() if "<" in value else value.strip()
+            # Visibility is kept per member (None if unmarked) because the text format does not preserve it
+            element = {"type": "class", "name": class_name, "attributes": [], "methods": [],
+                       "visibility": {"attributes": [], "methods": []}}
+            elements[cell.id] = element
+
+            # The attributes and methods live in the text children of the swimlane
+            for child in children.get(cell.id, ()):
+                if not child.value or not has_style(child.style, "text"):
+                    continue
+                clean_value = HTML_TAG_RE.sub("", child.value)
+                for line in clean_value.split("\n"):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    # A line with parentheses is a method, anything else is an attribute
+                    kind = "methods" if "(" in line and ")" in line else "attributes"
+                    element[kind].append(_strip_visibility(line))
+                    element["visibility"][kind].append(_visibility(line))
+
+        # Check for multiplicity or relationship labels (text cells attached to an edge)
+        if has_style(style_map, "text") and "edgeStyle" not in style_map and value:
+            edge = cells_by_id.get(cell.parent)
+            if edge is None or not edge.is_edge:
+                continue
+            if MULTIPLICITY_RE.match(value):  # Multiplicity (e.g., 0...*, 1...1)
+                edge_multiplicity = multiplicities.setdefault(edge.id, {})
+                if cell.geometry_y is not None and edge.geometry_y is not None:
+                    cell_y = float(cell.geometry_y)
+                    source_y = _point_y(edge.source_point_y)
+                    target_y = _point_y(edge.target_point_y)
+                    # Assign multiplicity to source or target based on proximity
+                    if abs(cell_y - source_y) < abs(cell_y - target_y):
+                        edge_multiplicity["source"] = value
+                    else:
+                        edge_multiplicity["target"] = value
+            else:  # Relationship label (e.g., "Requests and receives ticket")
+                labels[edge.id] = value
+
+    for cell in cells:
+        if cell.is_edge:
+            relationships.append({"from": cell.source, "to": cell.target, "type": classify_edge(cell.style), "id": cell.id})
+
+    return {"elements": elements, "relationships": relationships, "multiplicities": multiplicities, "labels": labels}
+
+
+def format_uml_model(model: dict) -> str:
+    """
+    Render a parsed UML model into the simplified text format used for retrieval and prompting.
+    """
+    elements = model["elements"]
+    output = []
+    for data in elements.values():
+        output.append(f"Class: {data['name']}")
+        if data["attributes"]:
+            output.append("Attributes:")
+            for attr in data["attributes"]:
+                output.append(f"- {attr}")
+        if data["methods"]:
+            output.append("Methods:")
+            for method in data["methods"]:
+                output.append(f"+ {method}")
+        output.append("")
+
+    for rel in model["relationships"]:
+        from_class = elements.get(rel["from"], {}).get("name", "Unknown")
+        to_class = elements.get(rel["to"], {}).get("name", "Unknown")
+        rel_label = model["labels"].get(rel["id"], "")
+        multiplicity = model["multiplicities"].get(rel["id"], {})
+        source_multiplicity = multiplicity.get("source", "N/A")
+        target_multiplicity = multiplicity.get("target", "N/A")
+        output.append(f"Relationship: {rel['type']} from {from_class} to {to_class} (Source Multiplicity: {source_multiplicity}, Target Multiplicity: {target_multiplicity}, Label: {rel_label})")
+
+    return "\n".join(output)
+
+
+def iter_stream_chunks(stream, chunk_size: int = CHUNK_SIZE):
+    """
+    Read a binary file-like object in fixed-size chunks.
+    """
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def inflate_diagram(payload: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Decode a compressed draw.io page (base64 of raw deflate of the URL-encoded mxGraphModel XML)
+    and yield the XML in chunks without materializing the whole decompressed page.
+    """
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    compressed = base64.b64decode(payload)
+    pending = b""
+    for offset in range(0, len(compressed), chunk_size):
+        pending += decompressor.decompress(compressed[offset:offset + chunk_size])
+        # Keep a trailing, possibly incomplete %XX escape for the next round
+        cut = max(len(pending) - 2, 0)
+        split = pending.rfind(b"%", cut)
+        split = split if split != -1 else len(pending)
+        if split:
+            yield unquote_to_bytes(pending[:split])
+        pending = pending[split:]
+    pending += decompressor.flush()
+    if pending:
+        yield unquote_to_bytes(pending)
+
+
+def iter_pages(chunks):
+    """
+    Incrementally parse draw.io XML chunks and yield (page_name, cells) for every diagram page.
+    Handles plain mxGraphModel files as well as multi-page mxfile documents with uncompressed or
+    compressed <diagram> payloads. Elements are dropped from the tree as soon as they are consumed.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack = []
+    cells = []
+    page_name = None
+    page_has_model = False
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == "start":
+                stack.append(element)
+                if element.tag == "diagram":
+                    page_name = element.attrib.get("name")
+                    page_has_model = False
+                continue
+
+            stack.pop()
+            parent = stack[-1] if stack else None
+            if element.tag == "mxCell":
+                cells.append(Cell(element))
+            elif element.tag == "mxGraphModel":
+                page_has_model = True
+                yield page_name, cells
+                cells = []
+            elif element.tag == "diagram" and not page_has_model and (element.text or "").strip():
+                for _, compressed_cells in iter_pages(inflate_diagram(element.text.strip())):
+                    yield page_name, compressed_cells
+
+            # Free consumed elements, keeping only the open ancestors on the stack
+            if element.tag in ("mxCell", "mxGraphModel", "diagram", "object", "UserObject"):
+                element.clear()
+                if parent is not None:
+                    parent.remove(element)
+    parser.close()
+
+
+def format_uml_pages(pages: list) -> str:
+    if len(pages) == 1:
+        return format_uml_model(pages[0][1])
+    return "\n\n".join(f"Page: {name or index + 1}\n{format_uml_model(model)}" for index, (name, model) in enumerate(pages))
+
+
+def extract_uml_models_from_chunks(chunks) -> tuple:
+    """
+    Parse draw.io XML chunks into (simplified text, [(page_name, model)]).
+    On malformed input the text is an error message and the page list is empty.
+    """
+    try:
+        pages = [(page_name, parse_uml_model(cells)) for page_name, cells in iter_pages(chunks)]
+        if not pages:
+            raise ValueError("Missing mxGraphModel in XML.")
+        return format_uml_pages(pages), pages
+
+    except Exception as e:
+        logger.warning("Error parsing XML to extract UML info: %s", e)
+        return "Could not extract UML information.", []
+
+
+def extract_uml_info_from_chunks(chunks) -> str:
+    return extract_uml_models_from_chunks(chunks)[0]
+
+
+def _byte_chunks(xml_content):
+    if isinstance(xml_content, str):
+        xml_content = xml_content.encode("utf-8")
+    return (xml_content[offset:offset + CHUNK_SIZE] for offset in range(0, len(xml_content), CHUNK_SIZE))
+
+
+def extract_uml_models_from_stream(stream) -> tuple:
+    """
+    Like extract_uml_info_from_stream, but also returns the parsed models (for the lint pass).
+    """
+    return extract_uml_models_from_chunks(iter_stream_chunks(stream))
+
+
+def extract_uml_models(xml_content) -> tuple:
+    return extract_uml_models_from_chunks(_byte_chunks(xml_content))
+
+
+def extract_uml_info_from_stream(stream) -> str:
+    """
+    Extract UML info from a binary file-like object (e.g. an upload) without reading it into memory at once.
+    """
+    return extract_uml_info_from_chunks(iter_stream_chunks(stream))
+
+
+def extract_uml_info(xml_content) -> str:
+    return extract_uml_info_from_chunks(_byte_chunks(xml_content))
@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def canonicalize_uml(simplified_text: str) -> str:
+    """
+    Canonical form of the extract_uml_info output: classes, members and relationships are sorted
+    and whitespace is collapsed, so reordering elements or moving them around in draw.io (layout-only
+    changes) yields the same form.
+    """
+    classes = {}
+    relationships = []
+    current = None
+    for line in simplified_text.split("\n"):
+        line = " ".join(line.split())
+        if not line or line in ("Attributes:", "Methods:") or line.startswith("Page:"):
+            continue
+        if line.startswith("Class:"):
+            current = classes.setdefault(line[len("Class:"):].strip(), {"attributes": [], "methods": []})
+        elif line.startswith("Relationship:"):
+            relationships.append(line)
+        elif current is not None and line.startswith("-"):
+            current["attributes"].append(line[1:].strip())
+        elif current is not None and line.startswith("+"):
+            current["methods"].append(line[1:].strip())
+        else:
+            relationships.append(line)
+
+    canonical = {
+        "classes": sorted([name, sorted(members["attributes"]), sorted(members["methods"])] for name, members in classes.items()),
+        "relationships": sorted(relationships),
+    }
+    return json.dumps(canonical, separators=(",", ":"), sort_keys=True)
+
+
+def cache_key(simplified_text: str, namespace: str = "", variant: str = "") -> str:
+    """
+    `variant` distinguishes inputs that share the simplified text but are analyzed differently
+    (e.g. different lint findings, which see visibility modifiers the text format drops).
+    """
+    digest = hashlib.sha256(namespace.encode("utf-8") + b"\0" + canonicalize_uml(simplified_text).encode("utf-8")
+                            + b"\0" + variant.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU cache with a maximum number of entries and a time-to-live.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    On-disk LRU cache in a SQLite file, so cached feedback survives restarts and is shared by workers.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: float = 7 * 24 * 3600, table: str = "feedback_cache"):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name '{table}'.")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.table = table  # Several caches with their own bounds can share one database file
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed)")
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(f"SELECT value, expires FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            self._db.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now),
+            )
+            self._db.execute(f"DELETE FROM {self.table} WHERE expires < ?", (now,))
+            self._db.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class FeedbackCache:
+    """
+    Content-addressed cache of LLM feedback keyed on the canonical UML structure, with hit/miss counters.
+    Concurrent submissions of the same diagram share a single computation.
+    """
+
+    def __init__(self, backend, namespace: str = ""):
+        self.backend = backend
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}
+
+    def key(self, simplified_text: str, variant: str = "") -> str:
+        return cache_key(simplified_text, self.namespace, variant)
+
+    def get(self, simplified_text: str, variant: str = ""):
+        value = self.backend.get(self.key(simplified_text, variant))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, simplified_text: str, feedback: str, variant: str = ""):
+        self.backend.set(self.key(simplified_text, variant), feedback)
+
+    async def get_or_compute(self, simplified_text: str, compute, is_cacheable=lambda feedback: True, variant: str = "") -> str:
+        """
+        Return cached feedback, or await compute(simplified_text) and cache it if is_cacheable(result).
+        If the request computing the feedback is cancelled, one of the requests waiting for it computes it.
+        """
+        key = self.key(simplified_text, variant)
+        while True:
+            cached = self.backend.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            try:
+                feedback = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # This request was cancelled
+                continue  # The request computing the feedback was cancelled: compute it here instead
+            self.hits += 1
+            return feedback
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            feedback = await compute(simplified_text)
+            if is_cacheable(feedback):
+                self.backend.set(key, feedback)
+            future.set_result(feedback)
+            return feedback
+        except asyncio.CancelledError:
+            # Only this request was cancelled; the others waiting for the feedback take over
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark as retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._pending[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self.backend),
+        }
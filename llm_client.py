@@ -0,0 +1,150 @@
+import asyncio
+import contextlib
+import json
+import logging
+import random
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMClient:
+    """
+    Async client for an OpenAI-compatible chat completions endpoint.
+
+    One pooled keep-alive connection pool is shared by all requests of the process, the number of
+    in-flight requests is capped by a semaphore, and 429/5xx responses or transport errors are
+    retried with exponential backoff (honouring Retry-After when the server sends it).
+
+    `span` (e.g. telemetry.span) times the wait for a concurrency slot as `queue_stage` and the API
+    request itself, retries included, as `request_stage`.
+    """
+
+    def __init__(self, api_url: str, api_key: str, timeout: float = 60.0, connect_timeout: float = 5.0,
+                 max_concurrency: int = 8, max_connections: int = 20, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 20.0, span=None,
+                 queue_stage: str = "llm_queue", request_stage: str = "llm_request"):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.span = span or (lambda stage: contextlib.nullcontext())
+        self.queue_stage = queue_stage
+        self.request_stage = request_stage
+        self._client = None
+        self._semaphore = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            )
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    @contextlib.asynccontextmanager
+    async def _slot(self):
+        """
+        Hold one of the `max_concurrency` slots; the time spent waiting for it is not part of the request stage.
+        """
+        with self.span(self.queue_stage):
+            await self.semaphore.acquire()
+        try:
+            with self.span(self.request_stage):
+                yield
+        finally:
+            self.semaphore.release()
+
+    def _retry_delay(self, attempt: int, response: httpx.Response = None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter keeps retrying workers from hitting the API in lockstep
+        return random.uniform(0, min(self.backoff_base * 2 ** attempt, self.backoff_max))
+
+    async def post(self, payload: dict) -> httpx.Response:
+        """
+        POST a chat completions payload, retrying on 429/5xx and transport errors.
+        Returns the last response; raises httpx.HTTPError if every attempt failed to get one.
+        """
+        async with self._slot():
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await self.client.post(self.api_url, json=payload)
+                except httpx.TransportError:
+                    if attempt == self.max_retries:
+                        raise
+                    await asyncio.sleep(self._retry_delay(attempt))
+                    continue
+
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    return response
+                logger.warning("LLM API returned %s, retrying (%d/%d)", response.status_code, attempt + 1, self.max_retries)
+                await asyncio.sleep(self._retry_delay(attempt, response))
+
+    async def stream(self, payload: dict, usage: dict = None):
+        """
+        POST a chat completions payload with "stream": true and yield the content deltas as they arrive.
+        Retries (429/5xx, transport errors) only happen before the first token has been received.
+        Raises httpx.HTTPStatusError if the API still answers with an error status.
+        If a usage dict is given, it is filled with the token counts the API reports at the end of the stream.
+        """
+        payload = dict(payload, stream=True, stream_options={"include_usage": True})
+        started = False
+        async with self._slot():
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with self.client.stream("POST", self.api_url, json=payload) as response:
+                        if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                            logger.warning("LLM API returned %s, retrying (%d/%d)", response.status_code, attempt + 1, self.max_retries)
+                            await asyncio.sleep(self._retry_delay(attempt, response))
+                            continue
+                        if response.status_code != 200:
+                            await response.aread()
+                            response.raise_for_status()
+
+                        async for line in response.aiter_lines():
+                            # Server-sent events: "data: {json chunk}" lines, terminated by "data: [DONE]"
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data == "[DONE]":
+                                return
+                            chunk = json.loads(data)
+                            # OpenAI-style APIs send "usage" in the last chunk; Groq nests it in "x_groq"
+                            chunk_usage = chunk.get("usage") or chunk.get("x_groq", {}).get("usage")
+                            if chunk_usage and usage is not None:
+                                usage.update(chunk_usage)
+                            delta = (chunk.get("choices") or [{}])[0].get("delta", {})
+                            if delta.get("content"):
+                                started = True
+                                yield delta["content"]
+                        return
+                except httpx.TransportError:
+                    # Retrying after tokens were forwarded would repeat them
+                    if started or attempt == self.max_retries:
+                        raise
+                    await asyncio.sleep(self._retry_delay(attempt))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,193 @@
+import re
+
+from uml_lint import format_lint_findings
+
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+LONG_WORD = 8  # Characters; longer words are split into several subword tokens by BPE tokenizers
+MEMBER_LINE_RE = re.compile(r"^\s*[-+#~]")
+
+# Static part of every prompt. It is sent as the system message and never contains per-request text,
+# so it is byte-identical across requests and can be served from the provider's prompt (prefix) cache.
+ROLE = "You are an expert in software architecture and UML modeling with deep knowledge of design principles and best practices."
+
+GUIDELINES = """## Instructions:
+- Interpret attributes and methods in the UML Input as follows: attributes start with '-', and methods start with '+'. For each attribute or method, identify any additional details like data types (e.g., String, Integer), parameters (e.g., user_info: String), or return types (e.g., : boolean), and include them in your analysis.
+- Evaluate the UML model against UML best practices, including proper use of visibility modifiers (public, private, protected), consistency in naming conventions, appropriate use of stereotypes, and alignment with the domain (e.g., a ticket distribution system).
+- Assess the design using software engineering principles such as encapsulation, cohesion, coupling, and SOLID principles (Single Responsibility, Open/Closed, Liskov Substitution, Interface Segregation, Dependency Inversion).
+- Provide detailed explanations for each identified issue and suggestion, including their impact on readability, maintainability, scalability, and functionality of the system."""
+
+INSTRUCTIONS = f"""{ROLE} Your task is to thoroughly analyze the provided UML model, focusing primarily on the UML Input below. Use the retrieved context from similar UML diagrams as a secondary reference to enhance your analysis where relevant (e.g., by comparing class structures, relationships, or design patterns). If the context is limited or unrelated, rely on your expertise in UML best practices to provide a comprehensive and detailed analysis.
+
+{GUIDELINES}
+
+## Expected Output:
+### 1. Classes & Attributes:
+- List each class along with its attributes and methods as extracted from the UML Input.
+- For each class:
+  - Comment on the completeness of attributes and methods (e.g., are essential attributes missing?).
+  - Evaluate naming conventions (e.g., clarity, consistency, adherence to standards like camelCase or PascalCase).
+  - Check for visibility modifiers (e.g., public, private) and suggest adding them if missing.
+  - Assess whether the class adheres to the Single Responsibility Principle (e.g., does it have too many responsibilities?).
+
+### 2. Relationships & Multiplicities:
+- List all detected relationships, including their type (e.g., association, aggregation, inheritance), source and target classes, multiplicities (if specified), and any labels.
+- For each relationship:
+  - Evaluate its correctness and appropriateness for the domain (e.g., does an aggregation make sense here?).
+  - Check if multiplicities are logical and complete (e.g., should a 1...1 be a 1...*?).
+  - Assess whether the relationship supports low coupling and high cohesion.
+  - Comment on any missing relationships that could improve the model (e.g., a missing dependency or association).
+
+### 3. Potential Issues:
+- Identify and explain issues in the UML model, such as:
+  - **Naming Issues**: Inconsistent or unclear names for classes, attributes, methods, or relationships (e.g., typos, non-descriptive names).
+  - **Design Issues**: Violations of UML best practices or design principles (e.g., lack of encapsulation, high coupling, low cohesion, SOLID violations).
+  - **Completeness Issues**: Missing classes, attributes, methods, or relationships that are essential for the domain.
+  - **Domain Appropriateness**: Elements that do not align with the system’s purpose (e.g., a ticket distribution system should have specific features).
+- For each issue, explain its impact on the system (e.g., how it affects readability, maintainability, or functionality).
+
+### 4. Scope of Improvement:
+- Provide a detailed analysis of how the UML model can be improved, considering the following aspects:
+  - **Structural Improvements**: Suggest adding or modifying classes, attributes, methods, or relationships to better represent the system (e.g., introduce a new class for a missing concept).
+  - **Design Pattern Applicability**: Recommend design patterns that could enhance the model (e.g., Factory pattern for ticket creation, Observer pattern for transaction updates).
+  - **Scalability and Maintainability**: Explain how the model can be made more scalable (e.g., by reducing coupling) and maintainable (e.g., by improving encapsulation).
+  - **Domain Alignment**: Suggest changes to better align the model with the domain (e.g., adding validation logic for tickets in a ticket distribution system).
+  - **Best Practices**: Recommend adherence to UML best practices (e.g., adding visibility modifiers, using stereotypes for clarity).
+- For each suggestion, provide a detailed explanation of how it improves the model, including benefits to readability, maintainability, scalability, and functionality.
+
+### 5. Comparison with Context (Optional):
+- If the retrieved context contains relevant UML diagrams, compare the input UML model with the context:
+  - Highlight similarities or differences in class structures, relationships, or design approaches.
+  - Suggest improvements based on patterns or practices observed in the context (e.g., "The context diagram uses a Factory pattern for ticket creation, which could be applied here").
+- If the context is not relevant, skip this section.
+
+Focus on providing a thorough, detailed, and actionable analysis that helps the user improve their UML model. Ensure all suggestions are practical and directly applicable to the given diagram."""
+
+
+# System message of incremental analyses (see uml_diff): feedback is written per class, so that the sections
+# of classes that did not change can be reused on the next upload of the same diagram.
+SECTIONED_INSTRUCTIONS = f"""{ROLE} Your task is to review the classes listed under "Classes to Analyze" in the UML Input below. The UML Input may be an excerpt of a larger diagram: it contains these classes and the classes directly related to them. Use the retrieved context from similar UML diagrams as a secondary reference where relevant.
+
+{GUIDELINES}
+
+## Expected Output:
+- Write one section for each class listed under "Classes to Analyze", in that order, and no sections for any other class. Start each section with a heading line of exactly the form "## Class: <ClassName>".
+- In each class section: comment on the completeness of its attributes and methods, naming conventions, visibility modifiers and the Single Responsibility Principle; evaluate the relationships and multiplicities the class takes part in; and give concrete, practical improvements.
+- End with a section starting with the heading line "## Overall" that briefly covers issues spanning several classes (missing classes or relationships, design patterns, domain alignment), taking into account the other classes of the diagram listed in the input."""
+
+# Findings of the instant rule-based lint pass, which the user has already seen
+LINT_HEADER = ("## Rule-based Lint Findings (already reported to the user; do not repeat them, "
+               "focus on design issues these checks cannot see):")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate token count of a text for LLaMA-style BPE tokenizers: one token per punctuation mark
+    and per word, plus one for every further LONG_WORD characters of long identifiers.
+    """
+    return sum(1 + (len(piece) - 1) // LONG_WORD for piece in TOKEN_RE.findall(text))
+
+
+def summarize_diagram(diagram: str, max_tokens: int, count_tokens=estimate_tokens) -> str:
+    """
+    Shrink a PlantUML diagram to at most max_tokens: attribute and method lines are dropped first
+    (class declarations and relationships carry most of the structure), then trailing lines are cut.
+    """
+    if count_tokens(diagram) <= max_tokens:
+        return diagram
+    lines = [line for line in diagram.split("\n") if not MEMBER_LINE_RE.match(line)]
+    marker = "' ... members omitted"
+    kept, used = [], count_tokens(marker)
+    for position, line in enumerate(lines):
+        cost = count_tokens(line)
+        if used + cost > max_tokens:
+            marker = f"' ... members and {len(lines) - position} more lines omitted"
+            break
+        kept.append(line)
+        used += cost
+    kept.append(marker)
+    return "\n".join(kept)
+
+
+class AssembledPrompt:
+    """
+    Chat messages for one analysis, with the bookkeeping needed to report prompt size.
+    """
+
+    def __init__(self, messages: list, token_count: int, context_files: list, dropped: dict):
+        self.messages = messages
+        self.token_count = token_count
+        self.context_files = context_files
+        self.dropped = dropped
+
+    def to_dict(self) -> dict:
+        return {"prompt_tokens": self.token_count, "context_files": self.context_files, "dropped": self.dropped}
+
+
+class PromptAssembler:
+    """
+    Builds prompts within a token budget. Retrieved diagrams below min_similarity or from a file that
+    already contributed a better match are dropped, oversized ones are summarized, and the rest are
+    added best-first while they fit. The UML input itself is never shortened.
+    """
+
+    def __init__(self, token_budget: int = 3000, min_similarity: float = 0.15, max_context_tokens: int = 600,
+                 max_context_diagrams: int = 3, count_tokens=estimate_tokens):
+        self.token_budget = token_budget
+        self.min_similarity = min_similarity
+        self.max_context_tokens = max_context_tokens
+        self.max_context_diagrams = max_context_diagrams
+        self.count_tokens = count_tokens
+        self.instructions_tokens = count_tokens(INSTRUCTIONS)
+        self.sectioned_instructions_tokens = count_tokens(SECTIONED_INSTRUCTIONS)
+
+    def assemble(self, xml_text: str, matches: list, lint_findings: list = None, classes: list = None,
+                 other_classes: list = ()) -> AssembledPrompt:
+        """
+        matches are (file_name, similarity, diagram) tuples, best first.
+        lint_findings (see uml_lint) were already shown to the user, so the model is asked to build on them
+        rather than spend output tokens rediscovering them.
+        With `classes`, the feedback is requested as one section per listed class (SECTIONED_INSTRUCTIONS);
+        other_classes names the rest of the diagram, whose feedback is not requested.
+        """
+        dropped = {"below_threshold": 0, "duplicate": 0, "over_budget": 0, "summarized": 0}
+        input_part = f"## UML Input (Simplified Text Format):\n{xml_text}"
+        if classes is not None:
+            input_part += f"\n\n## Classes to Analyze:\n{', '.join(classes)}"
+            if other_classes:
+                input_part += f"\n\n## Other Classes of the Diagram (already reviewed, not shown):\n{', '.join(other_classes)}"
+        if lint_findings:
+            input_part = f"{LINT_HEADER}\n{format_lint_findings(lint_findings)}\n\n{input_part}"
+        instructions = INSTRUCTIONS if classes is None else SECTIONED_INSTRUCTIONS
+        instructions_tokens = self.instructions_tokens if classes is None else self.sectioned_instructions_tokens
+        used = instructions_tokens + self.count_tokens(input_part) + self.count_tokens("## Context (Similar UML Diagrams):")
+
+        blocks, context_files, seen_files, seen_diagrams = [], [], set(), set()
+        for file_name, similarity, diagram in matches:
+            if similarity < self.min_similarity:
+                dropped["below_threshold"] += 1
+                continue
+            if len(blocks) == self.max_context_diagrams:
+                break
+            if file_name in seen_files or diagram in seen_diagrams:
+                dropped["duplicate"] += 1
+                continue
+            summary = summarize_diagram(diagram, self.max_context_tokens, self.count_tokens)
+            block = f"### From {file_name} (Similarity: {similarity:.4f}):\n{summary}"
+            cost = self.count_tokens(block)
+            if used + cost > self.token_budget:
+                dropped["over_budget"] += 1
+                continue
+            if summary != diagram:
+                dropped["summarized"] += 1
+            seen_files.add(file_name)
+            seen_diagrams.add(diagram)
+            blocks.append(block)
+            context_files.append(file_name)
+            used += cost
+
+        context = "\n\n".join(blocks) if blocks else "No sufficiently similar diagrams were retrieved; rely on UML best practices."
+        messages = [
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": f"## Context (Similar UML Diagrams):\n{context}\n\n{input_part}"},
+        ]
+        return AssembledPrompt(messages, used, context_files, dropped)
@@ -0,0 +1,212 @@
+import re
+import zlib
+
+import numpy as np
+
+CLASS_RE = re.compile(r"^\s*(?:abstract\s+class|class|interface|enum)\s+\"?([\w.]+)")
+MEMBER_RE = re.compile(r"^\s*[-+#~]\s*(\w+)")
+EDGE_RE = re.compile(r"^\s*([\w.]+)\s+(?:\"[^\"]*\"\s+)?([<*o]?[-.]+[|]?[>*o]?)\s+(?:\"[^\"]*\"\s+)?([\w.]+)")
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def _gather_postings(indptr, columns):
+    """
+    Positions of all postings of the given columns in the CSC data/rows arrays, and the column each came from.
+    """
+    starts = indptr[columns].astype(np.int64)
+    lengths = indptr[columns + 1] - starts
+    total = int(lengths.sum())
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return np.arange(total, dtype=np.int64) + offsets, np.repeat(np.arange(len(columns)), lengths)
+
+
+def _top_k(rows, scores, top_k):
+    """
+    The top_k (rows, scores) by descending score, ties kept in row order.
+    """
+    if len(scores) > top_k:
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        rows, scores = rows[best], scores[best]
+    order = np.lexsort((rows, -scores))
+    return rows[order], scores[order]
+
+
+class DenseBackend:
+    """
+    Scores every indexed diagram with one sparse matrix product per batch of queries (the original approach).
+    """
+
+    def __init__(self, index):
+        # Importing scikit-learn takes over a second and only this backend uses it
+        from sklearn.metrics.pairwise import linear_kernel
+
+        self.index = index
+        self.matrix = index.matrix
+        self.linear_kernel = linear_kernel
+
+    def search(self, plantuml_texts: list, top_k: int) -> list:
+        """
+        Return [(rows, scores)] per query text, best match first.
+        """
+        similarities = self.linear_kernel(self.index.transform(plantuml_texts), self.matrix)
+        all_rows = np.arange(self.matrix.shape[0])
+        return [_top_k(all_rows, row, top_k) for row in similarities]
+
+
+class SparseTopKBackend:
+    """
+    Exact top-k over the inverted index: only the postings of the query's terms are touched.
+
+    Terms that occur in more than `max_df` of the diagrams (@startuml, class, ...) are left out of
+    candidate generation; candidates found through the rarer terms are rescored exactly, and the result
+    is accepted only if the k-th score beats the best any other diagram could reach through the common
+    terms alone. Otherwise the query falls back to accumulating every posting.
+    """
+
+    def __init__(self, index, max_df: float = 0.05):
+        self.index = index
+        self.matrix = index.matrix
+        self.max_df = max_df
+        self.num_rows = len(index.diagrams)
+        self.postings_indptr = np.asarray(index.postings_indptr)
+        lengths = np.diff(self.postings_indptr)
+        # Upper bound of each term's weight in any diagram
+        self.max_weight = np.zeros(len(lengths))
+        if len(index.postings_data):
+            nonempty = lengths > 0
+            self.max_weight[nonempty] = np.maximum.reduceat(index.postings_data, self.postings_indptr[:-1][nonempty])
+        self.document_frequency = lengths
+
+    def _accumulate(self, columns, weights, minlength=None):
+        positions, term = _gather_postings(self.postings_indptr, columns)
+        rows = self.index.postings_rows[positions]
+        contributions = self.index.postings_data[positions] * weights[term]
+        if minlength is not None:
+            return np.bincount(rows, contributions, minlength=minlength)
+        candidates, inverse = np.unique(rows, return_inverse=True)
+        return candidates, np.bincount(inverse, contributions, minlength=len(candidates))
+
+    def search_one(self, columns, weights, top_k: int):
+        common = self.document_frequency[columns] > self.max_df * self.num_rows
+        if common.any() and not common.all():
+            candidates, _ = self._accumulate(columns[~common], weights[~common])
+            if len(candidates) >= top_k:
+                query = np.zeros(self.matrix.shape[1])
+                query[columns] = weights
+                scores = self.matrix[candidates] @ query
+                rows, scores = _top_k(candidates, scores, top_k)
+                # A diagram sharing none of the rare terms scores at most this much
+                bound = float(weights[common] @ self.max_weight[columns[common]])
+                if scores[-1] > bound:
+                    return rows, scores
+        elif not common.any() and len(columns):
+            candidates, scores = self._accumulate(columns, weights)
+            if len(candidates) >= top_k:
+                return _top_k(candidates, scores, top_k)
+
+        scores = self._accumulate(columns, weights, minlength=self.num_rows)
+        return _top_k(np.arange(self.num_rows), scores, top_k)
+
+    def search(self, plantuml_texts: list, top_k: int) -> list:
+        queries = self.index.transform(plantuml_texts)
+        return [self.search_one(queries.indices[start:end], queries.data[start:end], top_k)
+                for start, end in zip(queries.indptr[:-1], queries.indptr[1:])]
+
+
+def structural_shingles(plantuml_text: str) -> set:
+    """
+    Structure of a PlantUML class diagram as a set of shingles: class and member names,
+    arrow kinds and typed edges. Layout, cardinalities and labels are ignored.
+    """
+    shingles = set()
+    for line in plantuml_text.split("\n"):
+        match = CLASS_RE.match(line)
+        if match:
+            shingles.add("class:" + match.group(1).lower())
+            continue
+        match = MEMBER_RE.match(line)
+        if match:
+            shingles.add("member:" + match.group(1).lower())
+            continue
+        match = EDGE_RE.match(line)
+        if match:
+            source, arrow, target = match.group(1).lower(), match.group(2), match.group(3).lower()
+            shingles.add("arrow:" + arrow)
+            shingles.add(f"edge:{source}{arrow}{target}")
+    return shingles
+
+
+class MinHashLSHBackend:
+    """
+    Approximate retrieval by structural similarity: MinHash signatures of the structural shingles are
+    banded into locality-sensitive hash tables, and only diagrams sharing a band with the query are
+    rescored with the exact TF-IDF dot product. Queries with fewer than top_k candidates use the exact
+    sparse backend instead.
+    """
+
+    def __init__(self, index, num_hashes: int = 64, bands: int = 16, seed: int = 1, chunk_size: int = 4096):
+        if num_hashes % bands:
+            raise ValueError("num_hashes must be a multiple of bands.")
+        self.index = index
+        self.matrix = index.matrix
+        self.bands = bands
+        self.rows_per_band = num_hashes // bands
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 31, num_hashes, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, num_hashes, dtype=np.uint64)
+        self.band_mix = rng.integers(1, 1 << 63, self.rows_per_band, dtype=np.uint64) | np.uint64(1)
+        self.fallback = SparseTopKBackend(index)
+
+        signatures = np.vstack([self.signatures([index.diagrams[row] for row in range(start, min(start + chunk_size, len(index.diagrams)))])
+                                for start in range(0, len(index.diagrams), chunk_size)] or [np.zeros((0, num_hashes), np.uint64)])
+        band_keys = self._band_keys(signatures)
+        # Per band, diagram rows sorted by bucket key, so a bucket is a searchsorted range
+        self.bucket_rows = np.argsort(band_keys, axis=0, kind="stable").T
+        self.bucket_keys = np.take_along_axis(band_keys, self.bucket_rows.T, axis=0).T
+
+    def signatures(self, plantuml_texts: list) -> np.ndarray:
+        hashes, lengths = [], []
+        for text in plantuml_texts:
+            shingles = structural_shingles(text) or {""}
+            hashes.extend(zlib.crc32(shingle.encode("utf-8")) for shingle in shingles)
+            lengths.append(len(shingles))
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        # a, b < 2^31 and h < 2^32, so a * h + b cannot overflow 64 bits before the modulo
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % np.uint64(MERSENNE_PRIME)
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+        return np.minimum.reduceat(permuted, starts, axis=1).T
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        banded = signatures.reshape(len(signatures), self.bands, self.rows_per_band)
+        return (banded * self.band_mix).sum(axis=2)  # Wraps around mod 2^64, like any hash mix
+
+    def candidates(self, plantuml_text: str) -> np.ndarray:
+        keys = self._band_keys(self.signatures([plantuml_text]))[0]
+        found = []
+        for band, key in enumerate(keys):
+            low = np.searchsorted(self.bucket_keys[band], key, side="left")
+            high = np.searchsorted(self.bucket_keys[band], key, side="right")
+            found.append(self.bucket_rows[band, low:high])
+        return np.unique(np.concatenate(found))
+
+    def search(self, plantuml_texts: list, top_k: int) -> list:
+        queries = self.index.transform(plantuml_texts)
+        results = []
+        for position, text in enumerate(plantuml_texts):
+            start, end = queries.indptr[position], queries.indptr[position + 1]
+            candidates = self.candidates(text)
+            if len(candidates) < top_k:
+                results.append(self.fallback.search_one(queries.indices[start:end], queries.data[start:end], top_k))
+                continue
+            scores = (self.matrix[candidates] @ queries[position].T).toarray().ravel()
+            results.append(_top_k(candidates, scores, top_k))
+        return results
+
+
+BACKENDS = {"dense": DenseBackend, "sparse": SparseTopKBackend, "minhash": MinHashLSHBackend}
+
+
+def create_backend(name: str, index):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown retrieval backend '{name}' (expected one of {', '.join(BACKENDS)}).")
+    return BACKENDS[name](index)
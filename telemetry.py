@@ -0,0 +1,153 @@
+import contextlib
+import contextvars
+import logging
+import os
+import random
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+LOG_LEVEL = os.environ.get("UMLIFY_LOG_LEVEL", "INFO")
+# Fraction of requests whose timing summary (INFO) and payloads (DEBUG) are logged
+LOG_SAMPLE_RATE = float(os.environ.get("UMLIFY_LOG_SAMPLE_RATE", "0.01"))
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+stage_seconds = Histogram("umlify_stage_seconds", "Time spent in each stage of the analysis pipeline.",
+                          ["stage"], buckets=STAGE_BUCKETS)
+request_seconds = Histogram("umlify_request_seconds", "End-to-end latency of analysis requests.",
+                            ["endpoint"], buckets=STAGE_BUCKETS)
+llm_tokens = Histogram("umlify_llm_tokens", "Prompt and completion tokens per LLM call, as reported by the API.",
+                       ["kind"], buckets=TOKEN_BUCKETS)
+prompt_estimated_tokens = Histogram("umlify_prompt_estimated_tokens",
+                                    "Estimated tokens of each assembled prompt, before it is sent to the LLM.",
+                                    buckets=TOKEN_BUCKETS)
+incremental_classes = Counter("umlify_incremental_classes", "Classes re-analyzed or reused by incremental analyses.",
+                              ["outcome"])
+
+logger = logging.getLogger(__name__)
+
+# Stage timings of the request being handled; copied into threads by asyncio.to_thread and run_in_threadpool
+_trace = contextvars.ContextVar("umlify_trace", default=None)
+
+
+def configure_logging():
+    logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # httpx logs every LLM request at INFO; keep the HTTP stack quiet unless something goes wrong
+    for name in ("httpx", "httpcore"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+def sampled() -> bool:
+    """
+    Whether the current request was picked for verbose logging.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return random.random() < LOG_SAMPLE_RATE
+    return trace["sampled"]
+
+
+def log_sampled(log: logging.Logger, level: int, message: str, *args):
+    if log.isEnabledFor(level) and sampled():
+        log.log(level, message, *args)
+
+
+@contextlib.contextmanager
+def span(stage: str):
+    """
+    Time a pipeline stage into umlify_stage_seconds and the current request's trace.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.labels(stage).observe(elapsed)
+        trace = _trace.get()
+        if trace is not None:
+            trace["stages"][stage] = trace["stages"].get(stage, 0.0) + elapsed
+
+
+@contextlib.contextmanager
+def trace_request(endpoint: str, start: float = None):
+    """
+    Collect the spans of one request and record its total latency (from `start`, a time.perf_counter()
+    value, if the request began earlier); a sample of requests is logged with their per-stage breakdown.
+    """
+    trace = {"stages": {}, "tokens": {}, "sampled": random.random() < LOG_SAMPLE_RATE}
+    token = _trace.set(trace)
+    start = time.perf_counter() if start is None else start
+    try:
+        yield trace
+    finally:
+        elapsed = time.perf_counter() - start
+        try:
+            _trace.reset(token)
+        except ValueError:
+            _trace.set(None)  # Closed from another context (e.g. a streamed response abandoned by the client)
+        request_seconds.labels(endpoint).observe(elapsed)
+        if trace["sampled"]:
+            stages = " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in trace["stages"].items())
+            tokens = " ".join(f"{kind}_tokens={count}" for kind, count in trace["tokens"].items())
+            logger.info("%s %.1fms %s %s", endpoint, elapsed * 1000, stages, tokens)
+
+
+@contextlib.contextmanager
+def collect_spans():
+    """
+    Collect span timings outside of a request trace (e.g. before a streamed response starts), so that
+    they can be added to the trace later. Yields the stage -> seconds dict.
+    """
+    trace = {"stages": {}, "tokens": {}, "sampled": False}
+    token = _trace.set(trace)
+    try:
+        yield trace["stages"]
+    finally:
+        _trace.reset(token)
+
+
+def record_usage(usage: dict):
+    """
+    Record the token counts of an OpenAI-compatible "usage" object.
+    """
+    trace = _trace.get()
+    for kind in ("prompt", "completion"):
+        count = usage.get(f"{kind}_tokens")
+        if count is None:
+            continue
+        llm_tokens.labels(kind).observe(count)
+        if trace is not None:
+            trace["tokens"][kind] = trace["tokens"].get(kind, 0) + count
+
+
+def record_prompt(token_count: int):
+    """
+    Record the estimated token count of an assembled prompt (see prompt_builder).
+    """
+    prompt_estimated_tokens.observe(token_count)
+    trace = _trace.get()
+    if trace is not None:
+        trace["tokens"]["estimated_prompt"] = trace["tokens"].get("estimated_prompt", 0) + token_count
+
+
+def record_incremental(reanalyzed: int, reused: int):
+    """
+    Count the classes an incremental analysis sent to the model and those whose feedback it reused.
+    """
+    incremental_classes.labels("reanalyzed").inc(reanalyzed)
+    incremental_classes.labels("reused").inc(reused)
+
+
+def metrics_response():
+    """
+    Prometheus exposition of all metrics, merged across worker processes when PROMETHEUS_MULTIPROC_DIR is set.
+    Returns (body, content type).
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import re
+
+from drawio_parser import format_uml_pages
+
+SECTION_RE = re.compile(r"^#{1,4}\s*(?:Class:\s*(?P<name>.+?)|(?P<overall>Overall)\b.*?)\s*$", re.MULTILINE)
+NAME_DECORATION = "*`'\" "
+
+
+class UMLDiff:
+    """
+    Class and relationship level difference between two diagram structures (see diagram_structure).
+    """
+
+    def __init__(self, old: dict, new: dict):
+        old_classes, new_classes = old["classes"], new["classes"]
+        self.added = [name for name in new["order"] if name not in old_classes]
+        self.removed = [name for name in old["order"] if name not in new_classes]
+        self.modified = [name for name in new["order"] if name in old_classes and old_classes[name] != new_classes[name]]
+        old_relationships = {tuple(rel) for rel in old["relationships"]}
+        new_relationships = {tuple(rel) for rel in new["relationships"]}
+        self.added_relationships = sorted(new_relationships - old_relationships)
+        self.removed_relationships = sorted(old_relationships - new_relationships)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified or self.added_relationships or self.removed_relationships)
+
+    def changed_classes(self, new: dict) -> set:
+        """
+        Classes of the new structure that were added or edited, or gained or lost a relationship.
+        """
+        changed = set(self.added) | set(self.modified)
+        for _, source, target, *_ in self.added_relationships + self.removed_relationships:
+            changed.update(name for name in (source, target) if name in new["classes"])
+        return changed
+
+    def to_dict(self) -> dict:
+        return {
+            "added": self.added,
+            "removed": self.removed,
+            "modified": self.modified,
+            "added_relationships": len(self.added_relationships),
+            "removed_relationships": len(self.removed_relationships),
+        }
+
+
+def _signature(element: dict) -> list:
+    # Member order does not matter, visibility does (it changes the lint findings)
+    return sorted(f"{kind[0]}{marker or ''}:{member}"
+                  for kind in ("attributes", "methods")
+                  for member, marker in zip(element[kind], element["visibility"][kind]))
+
+
+def diagram_structure(pages: list) -> dict:
+    """
+    JSON-serializable structure of parsed pages (see drawio_parser.extract_uml_models): the member
+    signature of every class by name, the relationships between class names, and the class order.
+    Classes of the same name on several pages are merged.
+    """
+    classes, order, relationships = {}, [], []
+    for _, model in pages:
+        elements = model["elements"]
+        for element in elements.values():
+            if element["name"] not in classes:
+                classes[element["name"]] = []
+                order.append(element["name"])
+            classes[element["name"]] = sorted(classes[element["name"]] + _signature(element))
+        for rel in model["relationships"]:
+            multiplicity = model["multiplicities"].get(rel["id"], {})
+            relationships.append([rel["type"],
+                                  elements.get(rel["from"], {}).get("name", "Unknown"),
+                                  elements.get(rel["to"], {}).get("name", "Unknown"),
+                                  model["labels"].get(rel["id"], ""),
+                                  multiplicity.get("source", "N/A"), multiplicity.get("target", "N/A")])
+    return {"classes": classes, "order": order, "relationships": sorted(relationships)}
+
+
+def neighbours(structure: dict, names: set) -> set:
+    """
+    Classes directly related to any of `names`.
+    """
+    related = set()
+    for _, source, target, *_ in structure["relationships"]:
+        if source in names:
+            related.add(target)
+        if target in names:
+            related.add(source)
+    return related & structure["classes"].keys()
+
+
+def affected_classes(old: dict, new: dict) -> tuple:
+    """
+    (UMLDiff, classes to re-analyze): the changed classes and their neighbours, in diagram order.
+    Without a previous structure every class is affected.
+    """
+    if old is None:
+        return None, list(new["order"])
+    diff = UMLDiff(old, new)
+    changed = diff.changed_classes(new)
+    affected = changed | neighbours(new, changed)
+    return diff, [name for name in new["order"] if name in affected]
+
+
+def subset_text(pages: list, names) -> str:
+    """
+    Simplified text of only the given classes and the relationships between them.
+    """
+    names = set(names)
+    subset_pages = []
+    for page_name, model in pages:
+        elements = {element_id: element for element_id, element in model["elements"].items() if element["name"] in names}
+        relationships = [rel for rel in model["relationships"] if rel["from"] in elements and rel["to"] in elements]
+        if elements:
+            subset_pages.append((page_name, dict(model, elements=elements, relationships=relationships)))
+    return format_uml_pages(subset_pages) if subset_pages else ""
+
+
+def split_sections(feedback: str) -> tuple:
+    """
+    Split sectioned feedback into ({class name: "## Class: <name>" section}, overall section).
+    Text before the first heading is kept with the overall section.
+    """
+    sections, overall = {}, []
+    headings = list(SECTION_RE.finditer(feedback))
+    if not headings:
+        return sections, feedback.strip()
+    preamble = feedback[:headings[0].start()].strip()
+    if preamble:
+        overall.append(preamble)
+    for position, heading in enumerate(headings):
+        end = headings[position + 1].start() if position + 1 < len(headings) else len(feedback)
+        body = feedback[heading.end():end].strip()
+        if heading.group("name"):
+            name = heading.group("name").strip(NAME_DECORATION)
+            sections[name] = f"## Class: {name}\n{body}".rstrip()
+        else:
+            overall.append(f"## Overall\n{body}".rstrip())
+    return sections, "\n\n".join(overall)
+
+
+def merge_sections(order: list, sections: dict, overall: str) -> str:
+    """
+    Feedback for the whole diagram: the class sections in diagram order, then the overall section.
+    """
+    parts = [sections[name] for name in order if name in sections]
+    if overall:
+        parts.append(overall)
+    return "\n\n".join(parts)
+
+
+class SessionStore:
+    """
+    Last analyzed structure and per-class feedback of each diagram, kept in a cache backend of its own
+    (see feedback_cache; workers sharing a SQLite backend also share sessions).
+    """
+
+    def __init__(self, backend, namespace: str = "session"):
+        self.backend = backend
+        self.namespace = namespace
+
+    def key(self, session_key: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{session_key}".encode("utf-8")).hexdigest()
+
+    def get(self, session_key: str):
+        value = self.backend.get(self.key(session_key))
+        return json.loads(value) if value is not None else None
+
+    def set(self, session_key: str, structure: dict, sections: dict, overall: str):
+        state = {"structure": structure, "sections": sections, "overall": overall}
+        self.backend.set(self.key(session_key), json.dumps(state, separators=(",", ":")))
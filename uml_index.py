@@ -0,0 +1,451 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import time
+
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix, vstack
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 3
+# Same tokenization as sklearn's TfidfVectorizer defaults, so scores match the previous in-memory fit
+TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+UML_BLOCK_RE = re.compile(r'```(?:plantuml|uml)\n(.*?)\n```', re.DOTALL)
+
+# Every save goes to a fresh generation directory; CURRENT names the live one and is swapped atomically,
+# so processes attached to the index never see a half-written generation.
+CURRENT_FILE = "CURRENT"
+META_FILE = "meta.json"
+MANIFEST_FILE = "manifest.json"
+FILE_NAMES_FILE = "file_names.json"
+DIAGRAMS_FILE = "diagrams.bin"
+ARRAY_FILES = ("tfidf_data", "counts", "indices", "indptr", "idf", "postings_data", "postings_rows", "postings_indptr",
+               "vocabulary_terms", "vocabulary_columns", "diagram_offsets", "file_ids")
+ATTACH_RETRIES = 3
+
+
+def read_uml_blocks(file_path: str) -> list:
+    """
+    Extract the PlantUML blocks of a markdown file.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return [block.strip() for block in UML_BLOCK_RE.findall(content)]
+
+
+def tokenize(text: str) -> list:
+    return TOKEN_RE.findall(text.lower())
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_dataset(dataset_path: str) -> dict:
+    """
+    Stat every .markdown file of the dataset: {file_name: {"mtime": ..., "size": ...}}.
+    """
+    files = {}
+    with os.scandir(dataset_path) as entries:
+        for entry in entries:
+            if entry.name.endswith('.markdown') and entry.is_file():
+                stat = entry.stat()
+                files[entry.name] = {"mtime": stat.st_mtime, "size": stat.st_size}
+    return files
+
+
+def _normalize_rows(data: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+    row_lengths = np.diff(indptr)
+    rows = np.repeat(np.arange(len(row_lengths)), row_lengths)
+    norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(row_lengths)))
+    norms[norms == 0] = 1.0
+    return data / norms[rows]
+
+
+class Vocabulary:
+    """
+    Term -> column mapping stored as a sorted fixed-width bytes array, so it can be memory-mapped
+    and shared between processes instead of living in a per-process dict.
+    """
+
+    def __init__(self, terms: np.ndarray, columns: np.ndarray):
+        self.terms = terms
+        self.columns = columns
+
+    @classmethod
+    def from_dict(cls, vocabulary: dict) -> "Vocabulary":
+        terms = sorted(term.encode("utf-8") for term in vocabulary)
+        columns = [vocabulary[term.decode("utf-8")] for term in terms]
+        return cls(np.array(terms, dtype=bytes) if terms else np.zeros(0, dtype="S1"), np.asarray(columns, dtype=np.int32))
+
+    def to_dict(self) -> dict:
+        return {term.decode("utf-8"): int(column) for term, column in zip(self.terms, self.columns)}
+
+    def __len__(self):
+        return len(self.terms)
+
+    def lookup(self, tokens) -> np.ndarray:
+        """
+        Return the column of every token, or -1 for tokens outside the vocabulary.
+        """
+        if not len(self.terms) or not tokens:
+            return np.full(len(tokens), -1, dtype=np.int32)
+        keys = np.array([token.encode("utf-8") for token in tokens], dtype=bytes)
+        positions = np.searchsorted(self.terms, keys).clip(0, len(self.terms) - 1)
+        return np.where(self.terms[positions] == keys, self.columns[positions], -1)
+
+
+class DiagramStore:
+    """
+    Read-only sequence of diagram texts kept in one UTF-8 blob plus an offsets array.
+    """
+
+    def __init__(self, blob, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_texts(cls, texts) -> "DiagramStore":
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("diagram index out of range")
+        return self.blob[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+
+class FileNameList:
+    """
+    Read-only sequence of per-diagram source file names, stored as one id per row.
+    """
+
+    def __init__(self, names: list, ids: np.ndarray):
+        self.names = names
+        self.ids = ids
+
+    @classmethod
+    def from_names(cls, file_names) -> "FileNameList":
+        names, ids, positions = [], [], {}
+        for file_name in file_names:
+            if file_name not in positions:
+                positions[file_name] = len(names)
+                names.append(file_name)
+            ids.append(positions[file_name])
+        return cls(names, np.asarray(ids, dtype=np.int32))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, row: int) -> str:
+        return self.names[self.ids[row]]
+
+    def __iter__(self):
+        return (self.names[file_id] for file_id in self.ids)
+
+
+class UMLIndex:
+    """
+    TF-IDF retrieval index over the UML dataset, persisted as memory-mappable .npy files.
+
+    Raw term counts are kept next to the TF-IDF weights (both share the same CSR indices/indptr),
+    so files can be added, changed or removed by recomputing the IDF from document frequencies
+    instead of refitting the whole corpus. The same weights are also stored column-major
+    (term -> postings of (row, weight)) as an inverted index for top-k retrieval.
+    """
+
+    def __init__(self, vocabulary, counts, indices, indptr, diagrams, file_names, files,
+                 tfidf_data=None, idf=None, postings=None):
+        self.vocabulary = vocabulary
+        self.counts = counts
+        self.indices = indices
+        self.indptr = indptr
+        self.diagrams = diagrams
+        self.file_names = file_names
+        self._files = files
+        if tfidf_data is None or idf is None:
+            idf, tfidf_data = self._weights()
+        self.idf = idf
+        self.tfidf_data = tfidf_data
+        self.postings_data, self.postings_rows, self.postings_indptr = postings or self._postings()
+
+    @property
+    def files(self) -> dict:
+        # The manifest is only needed to refresh the index, so attached workers never parse it
+        if callable(self._files):
+            self._files = self._files()
+        return self._files
+
+    @files.setter
+    def files(self, files: dict):
+        self._files = files
+
+    @property
+    def matrix(self) -> csr_matrix:
+        return csr_matrix((self.tfidf_data, self.indices, self.indptr), shape=(len(self.diagrams), len(self.vocabulary)))
+
+    @property
+    def postings(self) -> csc_matrix:
+        return csc_matrix((self.postings_data, self.postings_rows, self.postings_indptr), shape=(len(self.diagrams), len(self.vocabulary)))
+
+    def _postings(self):
+        inverted = self.matrix.tocsc()
+        inverted.sort_indices()
+        return inverted.data, inverted.indices.astype(np.int32), inverted.indptr.astype(np.int32)
+
+    def _weights(self):
+        # Smoothed IDF, as in TfidfVectorizer(smooth_idf=True)
+        num_docs = len(self.indptr) - 1
+        df = np.bincount(self.indices, minlength=len(self.vocabulary))
+        idf = np.log((1 + num_docs) / (1 + df)) + 1
+        tfidf_data = _normalize_rows(self.counts * idf[self.indices], self.indptr)
+        return idf, tfidf_data
+
+    def transform(self, texts) -> csr_matrix:
+        """
+        Vectorize query texts with the index vocabulary and IDF weights (unknown terms are ignored).
+        """
+        data, indices, indptr = [], [], [0]
+        for text in texts:
+            columns = self.vocabulary.lookup(tokenize(text))
+            columns, counts = np.unique(columns[columns >= 0], return_counts=True)
+            indices.append(columns)
+            data.append(counts * self.idf[columns])
+            indptr.append(indptr[-1] + len(columns))
+        data = np.concatenate(data) if data else np.zeros(0)
+        indices = np.concatenate(indices).astype(np.int32) if indices else np.zeros(0, np.int32)
+        indptr = np.asarray(indptr, dtype=np.int32)
+        return csr_matrix((_normalize_rows(data, indptr), indices, indptr), shape=(len(texts), len(self.vocabulary)))
+
+    @classmethod
+    def build(cls, dataset_path: str) -> "UMLIndex":
+        index = cls(Vocabulary.from_dict({}), np.zeros(0, np.int32), np.zeros(0, np.int32), np.zeros(1, np.int32), [], [], {})
+        index.update(dataset_path)
+        return index
+
+    def update(self, dataset_path: str) -> bool:
+        """
+        Bring the index in line with the dataset directory. Only new or changed files are tokenized;
+        rows of changed or deleted files are dropped. Returns True if the index needs to be saved again.
+        """
+        current = scan_dataset(dataset_path)
+        stale = set(self.files) - set(current)
+        added = {}
+        touched = False
+        for file_name in sorted(current):
+            stat = current[file_name]
+            known = self.files.get(file_name)
+            if known and known["mtime"] == stat["mtime"] and known["size"] == stat["size"]:
+                continue
+            sha256 = file_sha256(os.path.join(dataset_path, file_name))
+            if known and known["sha256"] == sha256:
+                known.update(stat)  # Touched but identical content
+                touched = True
+                continue
+            if known:
+                stale.add(file_name)
+            added[file_name] = dict(stat, sha256=sha256)
+
+        if not stale and not added:
+            return touched
+
+        keep = [row for row, file_name in enumerate(self.file_names) if file_name not in stale]
+        new_rows = [(block, file_name) for file_name in added
+                    for block in read_uml_blocks(os.path.join(dataset_path, file_name))]
+        self._replace_rows(keep, new_rows)
+        self.files = {name: info for name, info in self.files.items() if name not in stale}
+        self.files.update(added)
+
+        if not len(self.diagrams):
+            raise ValueError("No UML diagrams found in .md files.")
+        logger.info("Indexed %d new/changed and dropped %d files: %d UML diagrams", len(added), len(stale), len(self.diagrams))
+        return True
+
+    @classmethod
+    def from_diagrams(cls, diagrams: list, file_names: list) -> "UMLIndex":
+        """
+        Build an in-memory index directly from diagram texts (e.g. synthetic corpora for benchmarks).
+        """
+        index = cls(Vocabulary.from_dict({}), np.zeros(0, np.int32), np.zeros(0, np.int32), np.zeros(1, np.int32), [], [], {})
+        index._replace_rows([], list(zip(diagrams, file_names)))
+        return index
+
+    def _replace_rows(self, keep: list, new_rows: list):
+        """
+        Keep the given existing rows, append (diagram, file_name) rows, and recompute the weights.
+        """
+        counts = csr_matrix((self.counts, self.indices, self.indptr), shape=(len(self.diagrams), len(self.vocabulary)))
+        counts = counts[keep]
+        diagrams = [self.diagrams[row] for row in keep]
+        file_names = [self.file_names[row] for row in keep]
+        vocabulary = self.vocabulary.to_dict()
+
+        data, indices, indptr = [], [], [0]
+        for block, file_name in new_rows:
+            row = {}
+            for token in tokenize(block):
+                column = vocabulary.setdefault(token, len(vocabulary))
+                row[column] = row.get(column, 0) + 1
+            columns = sorted(row)
+            indices.extend(columns)
+            data.extend(row[column] for column in columns)
+            indptr.append(len(indices))
+            diagrams.append(block)
+            file_names.append(file_name)
+
+        counts.resize((counts.shape[0], len(vocabulary)))
+        added_counts = csr_matrix((np.asarray(data, np.int32), np.asarray(indices, np.int32), np.asarray(indptr, np.int32)),
+                                  shape=(len(indptr) - 1, len(vocabulary)))
+        counts = vstack([counts, added_counts], format="csr")
+
+        # Drop the terms of removed rows that no remaining diagram contains: a fresh fit would not know them,
+        # and transform would otherwise weight them in queries
+        df = np.bincount(counts.indices, minlength=counts.shape[1])
+        if not df.all():
+            used = np.flatnonzero(df)
+            remap = np.full(len(df), -1)
+            remap[used] = np.arange(len(used))
+            counts = counts[:, used].tocsr()
+            vocabulary = {term: int(remap[column]) for term, column in vocabulary.items() if remap[column] >= 0}
+        counts.sort_indices()
+
+        self.vocabulary = Vocabulary.from_dict(vocabulary)
+        self.counts = counts.data.astype(np.int32)
+        self.indices = counts.indices.astype(np.int32)
+        self.indptr = counts.indptr.astype(np.int32)
+        self.diagrams = DiagramStore.from_texts(diagrams)
+        self.file_names = FileNameList.from_names(file_names)
+        self.idf, self.tfidf_data = self._weights()
+        self.postings_data, self.postings_rows, self.postings_indptr = self._postings()
+
+    def save(self, index_path: str):
+        """
+        Write the index into a new generation directory and atomically make it the current one.
+        """
+        generation = f"gen-{time.time_ns()}-{os.getpid()}"
+        generation_path = os.path.join(index_path, generation)
+        os.makedirs(generation_path)
+
+        arrays = {
+            "tfidf_data": self.tfidf_data, "counts": self.counts, "indices": self.indices, "indptr": self.indptr,
+            "idf": self.idf, "postings_data": self.postings_data, "postings_rows": self.postings_rows,
+            "postings_indptr": self.postings_indptr, "vocabulary_terms": self.vocabulary.terms, "vocabulary_columns": self.vocabulary.columns,
+            "diagram_offsets": self.diagrams.offsets, "file_ids": self.file_names.ids,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(generation_path, name + ".npy"), array)
+        with open(os.path.join(generation_path, DIAGRAMS_FILE), "wb") as f:
+            f.write(np.asarray(self.diagrams.blob).tobytes())
+        with open(os.path.join(generation_path, FILE_NAMES_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.file_names.names, f)
+        with open(os.path.join(generation_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f, indent=1)
+        with open(os.path.join(generation_path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "num_diagrams": len(self.diagrams)}, f)
+
+        current_tmp = os.path.join(index_path, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+        with open(current_tmp, "w", encoding="utf-8") as f:
+            f.write(generation)
+        os.replace(current_tmp, os.path.join(index_path, CURRENT_FILE))
+
+        # Attached processes keep their mappings of older generations valid even after the files are unlinked
+        for entry in os.listdir(index_path):
+            if entry.startswith("gen-") and entry != generation:
+                shutil.rmtree(os.path.join(index_path, entry), ignore_errors=True)
+
+    @classmethod
+    def load(cls, index_path: str) -> "UMLIndex":
+        """
+        Attach to the current generation of a saved index. Arrays and diagram texts are memory-mapped
+        read-only, so every process attached to the same index shares one copy through the page cache.
+        """
+        for attempt in range(ATTACH_RETRIES):
+            with open(os.path.join(index_path, CURRENT_FILE), encoding="utf-8") as f:
+                generation_path = os.path.join(index_path, f.read().strip())
+            try:
+                return cls._load_generation(generation_path)
+            except FileNotFoundError:
+                # The generation was replaced while we were attaching; follow CURRENT again
+                if attempt == ATTACH_RETRIES - 1:
+                    raise
+
+    @classmethod
+    def _load_generation(cls, generation_path: str) -> "UMLIndex":
+        with open(os.path.join(generation_path, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version {meta.get('version')} in '{generation_path}'.")
+        with open(os.path.join(generation_path, FILE_NAMES_FILE), encoding="utf-8") as f:
+            names = json.load(f)
+        arrays = {name: np.load(os.path.join(generation_path, name + ".npy"), mmap_mode="r") for name in ARRAY_FILES}
+        blob_path = os.path.join(generation_path, DIAGRAMS_FILE)
+        blob = np.memmap(blob_path, dtype=np.uint8, mode="r") if os.path.getsize(blob_path) else np.zeros(0, np.uint8)
+        return cls(
+            Vocabulary(arrays["vocabulary_terms"], arrays["vocabulary_columns"]),
+            arrays["counts"], arrays["indices"], arrays["indptr"],
+            DiagramStore(blob, arrays["diagram_offsets"]),
+            FileNameList(names, arrays["file_ids"]),
+            lambda: _read_manifest(generation_path), tfidf_data=arrays["tfidf_data"], idf=arrays["idf"],
+            postings=(arrays["postings_data"], arrays["postings_rows"], arrays["postings_indptr"]),
+        )
+
+
+def _read_manifest(generation_path: str) -> dict:
+    with open(os.path.join(generation_path, MANIFEST_FILE), encoding="utf-8") as f:
+        return json.load(f)["files"]
+
+
+def load_or_build_index(dataset_path: str, index_path: str) -> UMLIndex:
+    """
+    Load the on-disk index, incrementally refreshing it if dataset files were added, changed or removed.
+    Falls back to a full build when no usable index exists yet.
+    """
+    start = time.perf_counter()
+    try:
+        index = UMLIndex.load(index_path)
+    except (OSError, ValueError) as e:
+        logger.warning("No usable retrieval index at '%s' (%s), building it from '%s'", index_path, e, dataset_path)
+        index = UMLIndex.build(dataset_path)
+        index.save(index_path)
+    else:
+        if index.update(dataset_path):
+            index.save(index_path)
+    logger.info("Loaded retrieval index with %d UML diagrams in %.1f ms", len(index.diagrams), (time.perf_counter() - start) * 1000)
+    return index
+
+
+def attach_index(index_path: str) -> UMLIndex:
+    """
+    Attach read-only to an index built by another process, without checking the dataset for changes.
+    Used by worker processes in multi-worker deployments.
+    """
+    start = time.perf_counter()
+    index = UMLIndex.load(index_path)
+    logger.info("Attached to retrieval index with %d UML diagrams in %.1f ms", len(index.diagrams), (time.perf_counter() - start) * 1000)
+    return index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        raise SystemExit("Usage: python uml_index.py <dataset_path> <index_path>")
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    load_or_build_index(sys.argv[1], sys.argv[2])
@@ -0,0 +1,158 @@
+import re
+
+CLASS_NAME_RE = re.compile(r"^[A-Z][A-Za-z0-9]*$")  # PascalCase
+MEMBER_NAME_RE = re.compile(r"^[a-z][A-Za-z0-9]*$")  # camelCase
+CONSTANT_NAME_RE = re.compile(r"^[A-Z][A-Z0-9_]*$")  # UPPER_CASE attributes are constants
+MEMBER_PREFIX_RE = re.compile(r"^\s*[-+#~]?\s*([^\s:(]+)")
+GENERIC_RE = re.compile(r"<[^>]*>")
+MAX_LISTED = 5  # Member names listed per finding
+MAX_PROMPT_FINDINGS = 30  # Findings passed on to the LLM
+
+SEVERITY_ORDER = {"error": 0, "warning": 1, "info": 2}
+
+
+def _finding(rule: str, severity: str, element: str, message: str, page=None) -> dict:
+    finding = {"rule": rule, "severity": severity, "element": element, "message": message}
+    if page is not None:
+        finding["page"] = page
+    return finding
+
+
+def _listed(names: list) -> str:
+    # Sorted, so that the message (and the feedback cache variant built from it) does not depend on member order
+    names = sorted(names)
+    shown = ", ".join(names[:MAX_LISTED])
+    return shown + (f" and {len(names) - MAX_LISTED} more" if len(names) > MAX_LISTED else "")
+
+
+def _member_name(member: str) -> str:
+    match = MEMBER_PREFIX_RE.match(member)
+    return match.group(1) if match else member
+
+
+def _inheritance_cycles(elements: dict, relationships: list) -> list:
+    """
+    Strongly connected components of the inheritance graph that contain a cycle (Tarjan, iterative).
+    """
+    graph = {}
+    for rel in relationships:
+        if rel["type"] == "inheritance" and rel["from"] in elements and rel["to"] in elements:
+            graph.setdefault(rel["from"], []).append(rel["to"])
+
+    index, lowlink, on_stack, stack, cycles = {}, {}, set(), [], []
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(graph.get(root, ())))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            advanced = False
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = lowlink[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(graph.get(successor, ()))))
+                    advanced = True
+                    break
+                if successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                lowlink[work[-1][0]] = min(lowlink[work[-1][0]], lowlink[node])
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                if len(component) > 1 or node in graph.get(node, ()):
+                    cycles.append(component[::-1])
+    return cycles
+
+
+def lint_uml_model(model: dict, page=None) -> list:
+    """
+    Deterministic structural checks of one parsed page (see drawio_parser.parse_uml_model).
+    Returns findings as {"rule", "severity", "element", "message"} dicts.
+    """
+    elements = model["elements"]
+    findings = []
+
+    for element in elements.values():
+        name = element["name"]
+        visibility = element.get("visibility", {})
+
+        if not element["attributes"] and not element["methods"]:
+            findings.append(_finding("empty_class", "warning", name, f"Class {name} has no attributes or methods.", page))
+
+        unmarked = [_member_name(member)
+                    for kind in ("attributes", "methods")
+                    for member, marker in zip(element[kind], visibility.get(kind, ()))
+                    if marker is None]
+        if unmarked:
+            findings.append(_finding("missing_visibility", "warning", name,
+                                     f"Class {name}: no visibility modifier (+, -, #, ~) on {_listed(unmarked)}.", page))
+
+        bare_name = GENERIC_RE.sub("", name).strip()
+        if not CLASS_NAME_RE.match(bare_name):
+            findings.append(_finding("naming", "info", name, f"Class name '{name}' is not PascalCase.", page))
+        badly_named = [member_name for member_name in map(_member_name, element["attributes"])
+                       if not MEMBER_NAME_RE.match(member_name) and not CONSTANT_NAME_RE.match(member_name)]
+        badly_named += [member_name for member_name in map(_member_name, element["methods"])
+                        if not MEMBER_NAME_RE.match(member_name)]
+        if badly_named:
+            findings.append(_finding("naming", "info", name,
+                                     f"Class {name}: member names not in camelCase: {_listed(badly_named)}.", page))
+
+    for rel in model["relationships"]:
+        source = elements.get(rel["from"], {}).get("name")
+        target = elements.get(rel["to"], {}).get("name")
+        if source and target:
+            continue
+        description = f"{rel['type']} from {source or 'Unknown'} to {target or 'Unknown'}"
+        label = model["labels"].get(rel["id"])
+        if label:
+            description += f" ('{label}')"
+        missing = " and ".join(end for end, known in (("source", source), ("target", target)) if not known)
+        findings.append(_finding("unknown_endpoint", "error", description,
+                                 f"Relationship {description} is not connected to a class at its {missing}.", page))
+
+    for cycle in _inheritance_cycles(elements, model["relationships"]):
+        names = [elements[element_id]["name"] for element_id in cycle]
+        start = names.index(min(names))  # Same message whatever order the classes were drawn in
+        names = names[start:] + names[:start]
+        path = " -> ".join(names + [names[0]])
+        findings.append(_finding("inheritance_cycle", "error", names[0], f"Inheritance cycle: {path}.", page))
+
+    return findings
+
+
+def lint_uml_pages(pages: list) -> list:
+    """
+    Lint every (page_name, model) of a diagram, most severe findings first.
+    """
+    findings = []
+    for position, (page_name, model) in enumerate(pages):
+        page = (page_name or str(position + 1)) if len(pages) > 1 else None
+        findings.extend(lint_uml_model(model, page))
+    findings.sort(key=lambda finding: SEVERITY_ORDER[finding["severity"]])
+    return findings
+
+
+def format_lint_findings(findings: list, limit: int = MAX_PROMPT_FINDINGS) -> str:
+    """
+    Findings as a bullet list for the prompt.
+    """
+    lines = [f"- [{finding['severity']}] " + (f"(page {finding['page']}) " if "page" in finding else "") + finding["message"]
+             for finding in findings[:limit]]
+    if len(findings) > limit:
+        lines.append(f"- ... and {len(findings) - limit} more")
+    return "\n".join(lines)